@@ -0,0 +1,337 @@
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+
+from .config import create_storage
+from .enums import STATUSES
+from .file_links import check_paths
+from .json_stream import RecordError, iter_json_array
+from .models import Project
+from .notify import ChangeNotifier
+from .repository import ProjectRepository
+from .service import ProjectService
+from .storage import create_temp
+
+IMPORT_FORMATS = ("csv", "jsonl", "json")
+EXPORT_FORMATS = ("csv", "jsonl")
+DEFAULT_CHUNK_SIZE = 5000
+CSV_COLUMNS = [
+    "id",
+    "name",
+    "client",
+    "opponent",
+    "lawyer",
+    "stage",
+    "completion",
+    "status",
+    "notes",
+    "files",
+    "created_at",
+    "updated_at",
+]
+# CSV 中附件路径每行一个，与编辑表单的路径列表一致
+FILE_SEPARATOR = "\n"
+# 进度回调的参数为已处理的记录数
+Progress = Callable[[int], None]
+
+
+@dataclass
+class ImportReport:
+    added: int = 0
+    updated: int = 0
+    errors: List[str] = field(default_factory=list)
+
+
+def detect_format(path: Path) -> str:
+    suffix = path.suffix.lower().lstrip(".")
+    if suffix == "ndjson":
+        return "jsonl"
+    if suffix not in IMPORT_FORMATS:
+        raise ValueError(f"无法识别的文件格式：{path.name}（支持 {', '.join(IMPORT_FORMATS)}）")
+    return suffix
+
+
+def read_records(handle: TextIO, fmt: str, errors: List[str]) -> Iterator[Tuple[str, dict]]:
+    """逐条读取导入文件，返回 (位置说明, 原始记录)；无法解析的内容记入 errors 后跳过"""
+    if fmt == "csv":
+        reader = csv.DictReader(handle)
+        if reader.fieldnames is None or "name" not in reader.fieldnames:
+            errors.append("CSV 缺少表头或缺少 name 列")
+            return
+        for row in reader:
+            yield f"第 {reader.line_num} 行", row
+    elif fmt == "jsonl":
+        for number, line in enumerate(handle, 1):
+            if not line.strip():
+                continue
+            try:
+                item = json.loads(line)
+            except json.JSONDecodeError as exc:
+                errors.append(f"第 {number} 行：无法解析的记录：{exc.msg}")
+                continue
+            if not isinstance(item, dict):
+                errors.append(f"第 {number} 行：记录不是 JSON 对象")
+                continue
+            yield f"第 {number} 行", item
+    elif fmt == "json":
+        record_errors: List[RecordError] = []
+        for number, item in enumerate(iter_json_array(handle, record_errors), 1):
+            yield f"第 {number} 条", item
+        errors.extend(str(error) for error in record_errors)
+    else:
+        raise ValueError(f"不支持的导入格式：{fmt}")
+
+
+def import_records(
+    repo: ProjectRepository,
+    records: Iterable[Tuple[str, dict]],
+    service: Optional[ProjectService] = None,
+    update_existing: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Optional[Progress] = None,
+    report: Optional[ImportReport] = None,
+) -> ImportReport:
+    """按块校验并构造项目（每块只批量检查一次附件路径），每块通过 add_many/update_many 各写入一次存储，
+    内存中只保留当前块。
+
+    编号已存在的项目在 update_existing 为 True 时覆盖更新，否则记为错误跳过。
+    记录中的 created_at/updated_at 原样保留，缺失时取当前时间。
+    中途出错（例如版本冲突）时，之前的块已经写入。
+    """
+    service = service or ProjectService()
+    report = report or ImportReport()
+    seen: Set[str] = set()
+    processed = 0
+    chunk: List[Tuple[str, dict]] = []
+    for entry in records:
+        chunk.append(entry)
+        if len(chunk) >= chunk_size:
+            _import_chunk(repo, service, chunk, update_existing, seen, report)
+            processed += len(chunk)
+            chunk = []
+            if progress is not None:
+                progress(processed)
+    if chunk:
+        _import_chunk(repo, service, chunk, update_existing, seen, report)
+        processed += len(chunk)
+        if progress is not None:
+            progress(processed)
+    return report
+
+
+def import_stream(
+    repo: ProjectRepository,
+    handle: TextIO,
+    fmt: str,
+    service: Optional[ProjectService] = None,
+    update_existing: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    progress: Optional[Progress] = None,
+) -> ImportReport:
+    report = ImportReport()
+    records = read_records(handle, fmt, report.errors)
+    return import_records(repo, records, service, update_existing, chunk_size, progress, report)
+
+
+def import_file(repo: ProjectRepository, path: Path, fmt: Optional[str] = None, **options: object) -> ImportReport:
+    fmt = fmt or detect_format(path)
+    # utf-8-sig 兼容 Excel 另存的带 BOM 的 CSV
+    with path.open("r", encoding="utf-8-sig", newline="") as handle:
+        return import_stream(repo, handle, fmt, **options)  # type: ignore[arg-type]
+
+
+def export_stream(
+    repo: ProjectRepository,
+    handle: TextIO,
+    fmt: str,
+    progress: Optional[Progress] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    """逐个项目写出，返回导出数量；格式与导入一致，导出的文件可以直接再导入"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"不支持的导出格式：{fmt}")
+    writer = csv.DictWriter(handle, CSV_COLUMNS) if fmt == "csv" else None
+    if writer is not None:
+        writer.writeheader()
+    count = 0
+    for project in repo.list_full():
+        if writer is not None:
+            writer.writerow(_csv_row(project))
+        else:
+            handle.write(json.dumps(project.to_dict(), ensure_ascii=False) + "\n")
+        count += 1
+        if progress is not None and count % chunk_size == 0:
+            progress(count)
+    if progress is not None:
+        progress(count)
+    return count
+
+
+def export_file(repo: ProjectRepository, path: Path, fmt: Optional[str] = None, progress: Optional[Progress] = None) -> int:
+    """写入临时文件后替换；CSV 带 BOM，便于 Excel 直接打开中文内容"""
+    fmt = fmt or detect_format(path)
+    encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+    fd, temp_path = create_temp(path)
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, newline="") as handle:
+            count = export_stream(repo, handle, fmt, progress)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return count
+
+
+def _import_chunk(
+    repo: ProjectRepository,
+    service: ProjectService,
+    chunk: List[Tuple[str, dict]],
+    update_existing: bool,
+    seen: Set[str],
+    report: ImportReport,
+) -> None:
+    added: List[Project] = []
+    updated: List[Project] = []
+    paths = [_file_paths(record.get("files")) for _, record in chunk]
+    statuses = check_paths(path for file_paths in paths for path in file_paths)
+    existing = repo.get_many(_text(record.get("id")).strip() for _, record in chunk)
+    for (location, record), file_paths in zip(chunk, paths):
+        try:
+            project = _build_project(service, record, file_paths, statuses)
+        except ValueError as exc:
+            report.errors.append(f"{location}：{exc}")
+            continue
+        if project.id in seen:
+            report.errors.append(f"{location}：文件中重复的项目编号 {project.id}")
+            continue
+        seen.add(project.id)
+        current = existing.get(project.id)
+        if current is None:
+            added.append(project)
+        elif update_existing:
+            project.version = current.version
+            project.created_at = project.created_at or current.created_at
+            updated.append(project)
+        else:
+            report.errors.append(f"{location}：项目编号已存在 {project.id}")
+    report.added += repo.add_many(added, keep_timestamps=True)
+    report.updated += repo.update_many(updated, keep_timestamps=True)
+
+
+def _build_project(service: ProjectService, record: dict, file_paths: List[str], statuses: Dict) -> Project:
+    name = _text(record.get("name")).strip()
+    if not name:
+        raise ValueError("缺少项目名称")
+    status = _text(record.get("status")).strip() or STATUSES[0]
+    if status not in STATUSES:
+        raise ValueError(f"未知的状态「{status}」（可选：{'、'.join(STATUSES)}）")
+    project = service.build_project(
+        name=name,
+        client=_text(record.get("client")).strip(),
+        opponent=_text(record.get("opponent")).strip(),
+        lawyer=_text(record.get("lawyer")).strip(),
+        stage=_text(record.get("stage")).strip(),
+        completion=_completion(record.get("completion")),
+        status=status,
+        notes=_text(record.get("notes")).strip(),
+        file_paths=file_paths,
+        project_id=_text(record.get("id")).strip() or None,
+        statuses=statuses,
+    )
+    project.created_at = _timestamp(record.get("created_at"))
+    # 与 migrate.upgrade_record 一致，缺少修改时间时沿用创建时间
+    project.updated_at = _timestamp(record.get("updated_at")) or project.created_at
+    return project
+
+
+def _csv_row(project: Project) -> Dict[str, object]:
+    row = project.to_dict()
+    row["files"] = FILE_SEPARATOR.join(file.path for file in project.files)
+    del row["version"]
+    return row
+
+
+def _text(value: object) -> str:
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def _completion(value: object) -> int:
+    text = _text(value).strip().rstrip("%")
+    if not text:
+        return 0
+    try:
+        completion = float(text)
+    except ValueError:
+        raise ValueError(f"完成度不是数字：{text}") from None
+    if not 0 <= completion <= 100:
+        raise ValueError(f"完成度应在 0–100 之间：{text}")
+    return int(completion)
+
+
+def _timestamp(value: object) -> str:
+    """ISO 8601 格式的时间，统一精确到秒；为空时返回空字符串"""
+    text = _text(value).strip()
+    if not text:
+        return ""
+    try:
+        return datetime.fromisoformat(text).isoformat(timespec="seconds")
+    except ValueError:
+        raise ValueError(f"时间格式无效：{text}（应为 2024-01-31T09:30:00 或 2024-01-31 09:30:00）") from None
+
+
+def _file_paths(value: object) -> List[str]:
+    """CSV 中为换行分隔的路径；JSON 中为路径字符串或 to_dict() 形式的附件列表"""
+    if isinstance(value, str):
+        entries: Iterable[object] = value.splitlines()
+    elif isinstance(value, list):
+        entries = value
+    else:
+        return []
+    paths = []
+    for entry in entries:
+        path = _text(entry.get("path") if isinstance(entry, dict) else entry).strip()
+        if path:
+            paths.append(path)
+    return list(dict.fromkeys(paths))
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="批量导入或导出项目（CSV / JSONL）")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("file", type=Path, help="导入或导出的文件，格式按扩展名识别")
+    parser.add_argument("--data", type=Path, default=Path("data/projects.json"), help="数据文件，默认 data/projects.json")
+    parser.add_argument("--format", choices=IMPORT_FORMATS, help="文件格式，省略时按扩展名识别")
+    parser.add_argument("--update", action="store_true", help="导入时覆盖编号已存在的项目")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    # 发布变更通知，正在运行的看板会自动刷新
+    repo = ProjectRepository(args.data, create_storage(args.data), notifier=ChangeNotifier(args.data.parent / ".changes"))
+
+    def report_progress(count: int) -> None:
+        print(f"\r已处理 {count} 个项目", end="", file=sys.stderr, flush=True)
+
+    if args.action == "export":
+        count = export_file(repo, args.file, args.format, progress=report_progress)
+        print(f"\n已导出 {count} 个项目到 {args.file}", file=sys.stderr)
+        return 0
+    report = import_file(repo, args.file, args.format, update_existing=args.update, progress=report_progress)
+    print(f"\n新增 {report.added} 个项目，更新 {report.updated} 个项目", file=sys.stderr)
+    for error in report.errors:
+        print(error, file=sys.stderr)
+    if report.errors:
+        print(f"跳过了 {len(report.errors)} 条记录", file=sys.stderr)
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,44 @@
+import os
+from pathlib import Path
+
+from .journal import JournalStorage
+from .jsonl_storage import JsonlStorage
+from .shards import MANIFEST_NAME, ShardedStorage
+from .sqlite_storage import SqliteStorage, migrate_json_to_sqlite
+from .storage import JsonStorage, Storage
+
+STORAGE_BACKENDS = ["json", "journal", "jsonl", "sharded", "sqlite"]
+STORAGE_BACKEND = os.environ.get("LAWYER_STORAGE_BACKEND", "json").strip().lower()
+# 开启后保存只进入内存队列，由后台线程合并写入（适合较慢的磁盘或网络卷）
+WRITE_BEHIND = os.environ.get("LAWYER_WRITE_BEHIND", "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def create_storage(data_file: Path, backend: str = STORAGE_BACKEND) -> Storage:
+    """按配置创建存储后端，data_file 为 projects.json 的路径"""
+    if backend == "json":
+        return JsonStorage(data_file)
+    if backend == "journal":
+        return JournalStorage(data_file)
+    if backend == "jsonl":
+        jsonl_file = data_file.with_suffix(".jsonl")
+        is_new = not jsonl_file.exists()
+        storage = JsonlStorage(jsonl_file)
+        if is_new and data_file.exists():
+            # 首次切换到 JSONL 时导入现有的 JSON 数据
+            storage.save(JsonStorage(data_file).load())
+        return storage
+    if backend == "sharded":
+        directory = data_file.with_suffix("")
+        is_new = not (directory / MANIFEST_NAME).exists() and not any(directory.glob("*.json"))
+        storage = ShardedStorage(directory)
+        if is_new and data_file.exists():
+            # 首次切换到分片存储时把现有的 JSON 数据拆分为分片
+            storage.save(JsonStorage(data_file).load())
+        return storage
+    if backend == "sqlite":
+        db_file = data_file.with_suffix(".db")
+        if not db_file.exists() and data_file.exists():
+            # 首次切换到 SQLite 时自动迁移现有的 JSON 数据
+            migrate_json_to_sqlite(data_file, db_file)
+        return SqliteStorage(db_file)
+    raise ValueError(f"未知的存储后端：{backend}（可选：{', '.join(STORAGE_BACKENDS)}）")
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .models import Project
+
+ROLES = ("client", "opponent")
+
+# 按长度从长到短匹配，避免“有限公司”先于“股份有限公司”被截掉
+COMMON_SUFFIXES = sorted(
+    [
+        "股份有限公司",
+        "有限责任公司",
+        "集团有限公司",
+        "集团公司",
+        "有限公司",
+        "公司",
+        "集团",
+    ],
+    key=len,
+    reverse=True,
+)
+# 英文后缀只有作为末尾的完整单词时才去掉，否则 “Zinc”“Costco” 会被截成 “z”“cost”；
+# 元组表示连续的几个单词（“Co., Ltd.” 去掉标点后为 co ltd）
+LATIN_SUFFIXES = sorted(
+    [
+        ("co", "ltd"),
+        ("coltd",),
+        ("limited",),
+        ("ltd",),
+        ("incorporated",),
+        ("inc",),
+        ("corporation",),
+        ("corp",),
+        ("llc",),
+        ("company",),
+        ("co",),
+    ],
+    key=len,
+    reverse=True,
+)
+_SEPARATORS = re.compile(r"[、,，;；/\n]+")
+_NOISE = re.compile(r"[\W_]+")
+
+
+@lru_cache(maxsize=65536)
+def normalize_party_name(name: str) -> str:
+    """统一全角/半角、大小写，去掉空白和标点以及常见的公司后缀"""
+    words = [word for word in _NOISE.split(unicodedata.normalize("NFKC", name).casefold()) if word]
+    # 先按单词去掉英文后缀，再合并为不含空白的名称
+    for suffix in LATIN_SUFFIXES:
+        if len(words) > len(suffix) and tuple(words[-len(suffix) :]) == suffix:
+            return "".join(words[: -len(suffix)])
+    value = "".join(words)
+    for suffix in COMMON_SUFFIXES:
+        if value.endswith(suffix) and len(value) > len(suffix):
+            return value[: -len(suffix)]
+    return value
+
+
+def split_parties(text: str) -> List[str]:
+    """一个字段中可能以顿号、逗号等分隔多个当事人"""
+    return [part.strip() for part in _SEPARATORS.split(text) if part.strip()]
+
+
+class PartyIndex:
+    """当事人/相对人名称的规范化哈希索引，用于利益冲突检索。
+
+    重新加载后首次检索时才整体构建，不拖慢冷启动。
+    """
+
+    def __init__(self) -> None:
+        self._parties: Dict[str, Dict[str, Set[str]]] = {}
+        self._keys: Dict[str, List[Tuple[str, str]]] = {}
+        self._pending: Optional[Dict[str, Project]] = {}
+
+    def rebuild(self, projects: Iterable[Project]) -> None:
+        self._parties.clear()
+        self._keys.clear()
+        self._pending = {project.id: project for project in projects}
+
+    def add(self, project: Project) -> None:
+        if self._pending is not None:
+            self._pending[project.id] = project
+            return
+        self._write(project)
+
+    def remove(self, project_id: str) -> None:
+        if self._pending is not None:
+            self._pending.pop(project_id, None)
+            return
+        self._discard(project_id)
+
+    def lookup(self, name: str) -> Dict[str, Set[str]]:
+        """返回 {项目 id: 该名称在项目中的角色集合}"""
+        self._build()
+        result: Dict[str, Set[str]] = {}
+        for party in split_parties(name):
+            for project_id, roles in self._parties.get(normalize_party_name(party), {}).items():
+                result.setdefault(project_id, set()).update(roles)
+        return result
+
+    def _build(self) -> None:
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        for project in pending.values():
+            self._write(project)
+
+    def _write(self, project: Project) -> None:
+        self._discard(project.id)
+        keys = []
+        for role in ROLES:
+            for party in split_parties(getattr(project, role)):
+                key = normalize_party_name(party)
+                if not key:
+                    continue
+                self._parties.setdefault(key, {}).setdefault(project.id, set()).add(role)
+                keys.append((key, role))
+        self._keys[project.id] = keys
+
+    def _discard(self, project_id: str) -> None:
+        for key, _ in self._keys.pop(project_id, []):
+            projects = self._parties.get(key)
+            if projects is None:
+                continue
+            projects.pop(project_id, None)
+            if not projects:
+                del self._parties[key]
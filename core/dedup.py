@@ -0,0 +1,289 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .models import Project
+
+HASH_ALGORITHM = "blake2b"
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_INTERVAL = 600.0
+DEFAULT_BATCH_SIZE = 500
+# 处理一批附件意外失败后，后台线程等待该秒数再继续
+RETRY_INTERVAL = 5.0
+
+# (设备号, inode, 大小, mtime_ns)
+FileKey = Tuple[int, int, int, int]
+
+
+def hash_file(path: str) -> str:
+    """流式计算文件内容摘要；hashlib 处理大块数据时会释放 GIL，可在线程池中并行。
+
+    不使用 mmap：附件在读取期间被截断时访问映射会触发 SIGBUS，整个进程随之退出，普通读取只会抛出 OSError。
+    """
+    digest = hashlib.new(HASH_ALGORITHM)
+    with open(path, "rb") as handle:
+        buffer = bytearray(CHUNK_SIZE)
+        view = memoryview(buffer)
+        while True:
+            read = handle.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+
+def _file_key(path: str) -> Optional[FileKey]:
+    try:
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        # ValueError：路径中含有空字符等无效内容
+        return None
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+
+class HashCache:
+    """摘要缓存（SQLite），以 (设备号, inode, 大小, mtime) 为键，文件改名或移动后仍能命中"""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS digests ("
+            "device INTEGER NOT NULL, inode INTEGER NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "digest TEXT NOT NULL, PRIMARY KEY (device, inode))"
+        )
+
+    def get_many(self, keys: Iterable[FileKey]) -> Dict[FileKey, str]:
+        found: Dict[FileKey, str] = {}
+        with self._lock:
+            for key in keys:
+                row = self._conn.execute(
+                    "SELECT digest FROM digests WHERE device = ? AND inode = ? AND size = ? AND mtime_ns = ?", key
+                ).fetchone()
+                if row is not None:
+                    found[key] = row[0]
+        return found
+
+    def put_many(self, items: Dict[FileKey, str]) -> None:
+        if not items:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO digests (device, inode, size, mtime_ns, digest) VALUES (?, ?, ?, ?, ?)",
+                [(*key, digest) for key, digest in items.items()],
+            )
+
+
+class ContentHasher:
+    """附件内容去重：按内容摘要找出不同路径下的相同文件。
+
+    实现与 ProjectIndex 相同的 rebuild/add/remove 接口，由 ProjectRepository.attach 注册。
+    只有大小与其它附件相同的文件才需要计算摘要；计算在线程池中进行，结果持久化到 HashCache。
+    """
+
+    def __init__(
+        self,
+        cache_path: Path,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        interval: float = DEFAULT_INTERVAL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.cache = HashCache(cache_path)
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._owners: Dict[str, Set[str]] = {}
+        self._project_paths: Dict[str, List[str]] = {}
+        self._keys: Dict[str, FileKey] = {}
+        self._by_size: Dict[int, Set[str]] = {}
+        self._digests: Dict[str, str] = {}
+        self._by_digest: Dict[str, Set[str]] = {}
+        self._queue: List[str] = []
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="content-hash")
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def rebuild(self, projects: Iterable[Project]) -> None:
+        projects = list(projects)
+        current = {project.id for project in projects}
+        for project_id in [item for item in self._project_paths if item not in current]:
+            self.remove(project_id)
+        for project in projects:
+            self.add(project)
+
+    def add(self, project: Project) -> None:
+        paths = list(dict.fromkeys(file.path for file in project.files if not file.is_folder and file.path))
+        with self._lock:
+            old = self._project_paths.pop(project.id, [])
+            if paths:
+                self._project_paths[project.id] = paths
+            for path in old:
+                if path not in paths:
+                    self._release(path, project.id)
+            for path in paths:
+                owners = self._owners.setdefault(path, set())
+                if not owners:
+                    self._queue.append(path)
+                owners.add(project.id)
+        self._wake.set()
+
+    def remove(self, project_id: str) -> None:
+        with self._lock:
+            for path in self._project_paths.pop(project_id, []):
+                self._release(path, project_id)
+
+    def duplicates(self, path: str) -> List[str]:
+        """与该附件内容相同的其它路径"""
+        with self._lock:
+            digest = self._digests.get(path)
+            if digest is None:
+                return []
+            return sorted(other for other in self._by_digest[digest] if other != path)
+
+    def projects_sharing(self, path: str) -> Dict[str, List[str]]:
+        """引用了同一内容（无论路径是否相同）的项目，返回 {项目 id: [路径]}"""
+        with self._lock:
+            digest = self._digests.get(path)
+            paths = self._by_digest[digest] if digest is not None else {path}
+            shared: Dict[str, List[str]] = {}
+            for other in sorted(paths):
+                for project_id in self._owners.get(other, ()):
+                    shared.setdefault(project_id, []).append(other)
+            return shared
+
+    def duplicate_groups(self) -> List[List[str]]:
+        """所有内容重复的路径分组，按组大小降序"""
+        with self._lock:
+            groups = [sorted(paths) for paths in self._by_digest.values() if len(paths) > 1]
+        return sorted(groups, key=len, reverse=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "tracked": len(self._owners),
+                "hashed": len(self._digests),
+                "duplicate_groups": sum(1 for paths in self._by_digest.values() if len(paths) > 1),
+                "pending": len(self._queue),
+            }
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="content-hasher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=True)
+
+    def process_pending(self) -> int:
+        """stat 一批排队的附件，为大小发生碰撞的文件计算摘要，返回实际读取内容的文件数"""
+        with self._lock:
+            batch, self._queue = self._queue[: self.batch_size], self._queue[self.batch_size :]
+        if not batch:
+            return 0
+        keys = dict(zip(batch, self._executor.map(_file_key, batch)))
+        with self._lock:
+            for path, key in keys.items():
+                if path not in self._owners:
+                    continue
+                if key is None:
+                    self._forget(path)
+                elif self._keys.get(path) != key:
+                    self._forget(path)
+                    self._keys[path] = key
+                    self._by_size.setdefault(key[2], set()).add(path)
+            # 大小唯一的文件不可能有重复，不必读取内容
+            wanted = {
+                path: self._keys[path]
+                for path in keys
+                if path in self._keys and path not in self._digests and len(self._by_size[self._keys[path][2]]) > 1
+            }
+            for path in list(wanted):
+                for other in self._by_size[wanted[path][2]]:
+                    if other not in self._digests:
+                        wanted[other] = self._keys[other]
+        if not wanted:
+            return 0
+        cached = self.cache.get_many(set(wanted.values()))
+        stale = [path for path, key in wanted.items() if key not in cached]
+        computed: Dict[FileKey, str] = {}
+        for path, digest in zip(stale, self._executor.map(_hash_safely, stale)):
+            if digest is not None:
+                computed[wanted[path]] = digest
+        self.cache.put_many(computed)
+        digests = {**cached, **computed}
+        with self._lock:
+            for path, key in wanted.items():
+                digest = digests.get(key)
+                if digest is not None and self._keys.get(path) == key:
+                    self._digests[path] = digest
+                    self._by_digest.setdefault(digest, set()).add(path)
+        return len(stale)
+
+    def _run(self) -> None:
+        elapsed = 0.0
+        while not self._stop.is_set():
+            while self._queue and not self._stop.is_set():
+                try:
+                    self.process_pending()
+                except Exception:
+                    # 该批附件在下次定期复查时重新排队，线程继续处理后续的附件
+                    self._stop.wait(RETRY_INTERVAL)
+            woke = self._wake.wait(1.0)
+            self._wake.clear()
+            elapsed = 0.0 if woke else elapsed + 1.0
+            if elapsed >= self.interval:
+                # 定期复查所有附件，只有 stat 结果变化的文件才会重新计算
+                elapsed = 0.0
+                with self._lock:
+                    queued = set(self._queue)
+                    self._queue.extend(path for path in self._owners if path not in queued)
+
+    def _forget(self, path: str) -> None:
+        # 调用方已持有 self._lock
+        key = self._keys.pop(path, None)
+        if key is not None:
+            same_size = self._by_size.get(key[2])
+            if same_size is not None:
+                same_size.discard(path)
+                if not same_size:
+                    del self._by_size[key[2]]
+        digest = self._digests.pop(path, None)
+        if digest is not None:
+            paths = self._by_digest[digest]
+            paths.discard(path)
+            if not paths:
+                del self._by_digest[digest]
+
+    def _release(self, path: str, project_id: str) -> None:
+        # 调用方已持有 self._lock
+        owners = self._owners.get(path)
+        if owners is None:
+            return
+        owners.discard(project_id)
+        if not owners:
+            del self._owners[path]
+            self._forget(path)
+
+
+def _hash_safely(path: str) -> Optional[str]:
+    try:
+        return hash_file(path)
+    except (OSError, ValueError):
+        return None
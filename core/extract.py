@@ -0,0 +1,331 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+import sqlite3
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from xml.etree import ElementTree
+
+from .models import Project
+from .search import TextIndex, query_terms
+
+TEXT_EXTENSIONS = {".txt", ".md", ".csv", ".json", ".xml", ".html", ".htm", ".log"}
+OOXML_EXTENSIONS = {".docx", ".xlsx", ".pptx"}
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS | OOXML_EXTENSIONS
+# 单个文件最多保留的字符数，避免超大文件撑爆索引
+MAX_TEXT_CHARS = 200_000
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_INTERVAL = 300.0
+DEFAULT_BATCH_SIZE = 200
+# 处理一批附件意外失败后，后台线程等待该秒数再继续
+RETRY_INTERVAL = 5.0
+
+Key = Tuple[int, int]
+
+
+def extract_text(path: str) -> str:
+    """抽取文本；运行在子进程中，只依赖标准库"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in TEXT_EXTENSIONS:
+        return _read_text(path)
+    if extension == ".docx":
+        return _read_ooxml(path, lambda name: name.startswith("word/") and name.endswith(".xml"), "p")
+    if extension == ".xlsx":
+        return _read_ooxml(path, lambda name: name == "xl/sharedStrings.xml" or name.startswith("xl/worksheets/"), "si")
+    if extension == ".pptx":
+        return _read_ooxml(path, lambda name: name.startswith("ppt/slides/slide"), "p")
+    return ""
+
+
+def _read_text(path: str) -> str:
+    with open(path, "rb") as handle:
+        data = handle.read(MAX_TEXT_CHARS * 4)
+    for encoding in ("utf-8", "gb18030"):
+        try:
+            return data.decode(encoding)[:MAX_TEXT_CHARS]
+        except UnicodeDecodeError:
+            continue
+    return data.decode("utf-8", errors="ignore")[:MAX_TEXT_CHARS]
+
+
+def _read_ooxml(path: str, include, block_tag: str) -> str:
+    """读取 OOXML 包中的 XML 部件，收集所有 <t> 文本，遇到段落（或共享字符串）结束时换行"""
+    parts: List[str] = []
+    size = 0
+    with zipfile.ZipFile(path) as archive:
+        for name in sorted(archive.namelist()):
+            if not include(name):
+                continue
+            with archive.open(name) as handle:
+                # 尚未结束的祖先元素；每个元素读完即清空并从父元素中摘除，工作表等大部件不会整棵留在内存中
+                ancestors: List[ElementTree.Element] = []
+                for event, element in ElementTree.iterparse(handle, events=("start", "end")):
+                    if event == "start":
+                        ancestors.append(element)
+                        continue
+                    ancestors.pop()
+                    tag = element.tag.rsplit("}", 1)[-1]
+                    if tag == "t" and element.text:
+                        parts.append(element.text)
+                        size += len(element.text)
+                    elif tag == block_tag:
+                        parts.append("\n")
+                    element.clear()
+                    if ancestors:
+                        # 之前的兄弟元素都已摘除，这里总是父元素唯一的子元素
+                        ancestors[-1].remove(element)
+                    if size >= MAX_TEXT_CHARS:
+                        return "".join(parts)[:MAX_TEXT_CHARS]
+    return "".join(parts)
+
+
+def _extract_safely(path: str) -> Optional[str]:
+    # 附件内容不可控：不支持的压缩方式、加密条目等都只跳过该文件
+    try:
+        return extract_text(path)
+    except Exception:
+        return None
+
+
+class ExtractionCache:
+    """抽取结果缓存（SQLite），以 (路径, 大小, mtime) 为键，文件未变化时不会再次抽取"""
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS extracted ("
+            "path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, text TEXT NOT NULL)"
+        )
+
+    def get(self, path: str, key: Key) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT text FROM extracted WHERE path = ? AND size = ? AND mtime_ns = ?", (path, *key)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, path: str, key: Key, text: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extracted (path, size, mtime_ns, text) VALUES (?, ?, ?, ?)",
+                (path, *key, text),
+            )
+
+    def text(self, path: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT text FROM extracted WHERE path = ?", (path,)).fetchone()
+        return None if row is None else row[0]
+
+
+class AttachmentTextIndexer:
+    """附件全文索引：在进程池中抽取 .txt/.docx/.xlsx/.pptx 等文件的文本并写入倒排索引。
+
+    实现与 ProjectIndex 相同的 rebuild/add/remove 接口，由 ProjectRepository.attach 注册。
+    新附件立即排队；后台线程每隔 interval 秒按批 stat 已跟踪的文件，只重新抽取大小或 mtime 变化的文件。
+    """
+
+    def __init__(
+        self,
+        cache_path: Path,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        interval: float = DEFAULT_INTERVAL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> None:
+        self.cache = ExtractionCache(cache_path)
+        self.max_workers = max_workers
+        self.interval = interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._owners: Dict[str, Set[str]] = {}
+        self._project_paths: Dict[str, List[str]] = {}
+        self._keys: Dict[str, Key] = {}
+        self._queue: List[str] = []
+        self._index = TextIndex()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def rebuild(self, projects: Iterable[Project]) -> None:
+        projects = list(projects)
+        current = {project.id for project in projects}
+        for project_id in [item for item in self._project_paths if item not in current]:
+            self.remove(project_id)
+        for project in projects:
+            self.add(project)
+
+    def add(self, project: Project) -> None:
+        paths = [
+            file.path
+            for file in project.files
+            if not file.is_folder and file.path and os.path.splitext(file.path)[1].lower() in SUPPORTED_EXTENSIONS
+        ]
+        paths = list(dict.fromkeys(paths))
+        with self._lock:
+            old = self._project_paths.pop(project.id, [])
+            if paths:
+                self._project_paths[project.id] = paths
+            for path in old:
+                if path not in paths:
+                    self._release(path, project.id)
+            for path in paths:
+                owners = self._owners.setdefault(path, set())
+                if not owners:
+                    self._queue.append(path)
+                owners.add(project.id)
+        self._wake.set()
+
+    def remove(self, project_id: str) -> None:
+        with self._lock:
+            for path in self._project_paths.pop(project_id, []):
+                self._release(path, project_id)
+
+    def search(self, text: str, limit: int = 50) -> List[Tuple[str, str, float]]:
+        """在附件内容中检索，返回 (项目 id, 文件路径, 相关度)"""
+        with self._lock:
+            hits = self._index.search(text)[:limit]
+            return [
+                (project_id, path, score)
+                for path, score in hits
+                for project_id in sorted(self._owners.get(path, ()))
+            ]
+
+    def snippet(self, path: str, text: str, width: int = 40) -> str:
+        """从缓存的正文中截取命中位置附近的片段"""
+        content = self.cache.text(path) or ""
+        position = -1
+        for term, _ in query_terms(text):
+            position = content.casefold().find(term)
+            if position >= 0:
+                break
+        start = max(position - width, 0) if position >= 0 else 0
+        return content[start : start + width * 2].replace("\n", " ").strip()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"tracked": len(self._owners), "indexed": len(self._index), "pending": len(self._queue)}
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="attachment-text-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def process_pending(self) -> int:
+        """处理排队的附件，返回本轮重新抽取的文件数"""
+        with self._lock:
+            batch, self._queue = self._queue[: self.batch_size], self._queue[self.batch_size :]
+        if not batch:
+            return 0
+        stale: List[Tuple[str, Key]] = []
+        for path in batch:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self._drop(path)
+                continue
+            key = (stat.st_size, stat.st_mtime_ns)
+            with self._lock:
+                if self._keys.get(path) == key:
+                    continue
+            cached = self.cache.get(path, key)
+            if cached is not None:
+                self._store(path, key, cached)
+            else:
+                stale.append((path, key))
+        if stale:
+            paths = [path for path, _ in stale]
+            try:
+                texts = list(self._pool().map(_extract_safely, paths))
+            except BrokenProcessPool:
+                # 某个文件让子进程崩溃：重建进程池后逐个重试，单独处理仍然崩溃的文件直接跳过
+                self._reset_pool()
+                texts = [self._extract_isolated(path) for path in paths]
+            for (path, key), text in zip(stale, texts):
+                if text is None:
+                    # 无法抽取的文件按空正文记下 (大小, mtime)，文件不变就不会反复重试；仍可按文件名检索
+                    text = ""
+                self.cache.put(path, key, text)
+                self._store(path, key, text)
+        return len(stale)
+
+    def _run(self) -> None:
+        elapsed = 0.0
+        while not self._stop.is_set():
+            while self._queue and not self._stop.is_set():
+                try:
+                    self.process_pending()
+                except Exception:
+                    # 该批附件在下次定期复查时重新排队，线程继续处理后续的附件
+                    self._reset_pool()
+                    self._stop.wait(RETRY_INTERVAL)
+            woke = self._wake.wait(1.0)
+            self._wake.clear()
+            elapsed = 0.0 if woke else elapsed + 1.0
+            if elapsed >= self.interval:
+                # 定期复查所有附件，只有大小或 mtime 变化的才会重新抽取
+                elapsed = 0.0
+                with self._lock:
+                    queued = set(self._queue)
+                    self._queue.extend(path for path in self._owners if path not in queued)
+
+    def _store(self, path: str, key: Key, text: str) -> None:
+        with self._lock:
+            if path not in self._owners:
+                return
+            self._keys[path] = key
+            self._index.put(path, [(os.path.basename(path), 1.0), (text, 1.0)])
+
+    def _drop(self, path: str) -> None:
+        with self._lock:
+            self._keys.pop(path, None)
+            self._index.discard(path)
+
+    def _release(self, path: str, project_id: str) -> None:
+        # 调用方已持有 self._lock
+        owners = self._owners.get(path)
+        if owners is None:
+            return
+        owners.discard(project_id)
+        if not owners:
+            del self._owners[path]
+            self._keys.pop(path, None)
+            self._index.discard(path)
+
+    def _extract_isolated(self, path: str) -> Optional[str]:
+        try:
+            return self._pool().submit(_extract_safely, path).result()
+        except BrokenProcessPool:
+            self._reset_pool()
+            return None
+
+    def _reset_pool(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # 使用 spawn，避免在多线程的 Streamlit 进程中 fork
+            context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        return self._executor
@@ -1,6 +1,101 @@
+import os
+import stat
 import subprocess
-from pathlib import Path
-from typing import List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+# 网络共享盘上单次 stat 可能耗时数十毫秒，结果缓存一段时间并在线程池中并行检查
+DEFAULT_TTL = 30.0
+DEFAULT_NEGATIVE_TTL = 5.0
+DEFAULT_MAX_WORKERS = 16
+
+
+@dataclass(frozen=True)
+class PathStatus:
+    path: str
+    exists: bool
+    is_dir: bool = False
+    checked_at: float = 0.0
+
+
+class PathStatusCache:
+    """附件路径状态缓存：存在的路径缓存 ttl 秒，不存在的路径缓存 negative_ttl 秒"""
+
+    def __init__(
+        self,
+        ttl: float = DEFAULT_TTL,
+        negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> None:
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_workers = max_workers
+        self._entries: Dict[str, PathStatus] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def check(self, path: str, refresh: bool = False) -> PathStatus:
+        return self.check_many([path], refresh=refresh)[path]
+
+    def check_many(self, paths: Iterable[str], refresh: bool = False) -> Dict[str, PathStatus]:
+        """批量检查路径，未命中缓存的路径在线程池中并行 stat"""
+        now = time.monotonic()
+        result: Dict[str, PathStatus] = {}
+        pending: List[str] = []
+        with self._lock:
+            for path in dict.fromkeys(paths):
+                cached = None if refresh else self._entries.get(path)
+                if cached is not None and now - cached.checked_at < (self.ttl if cached.exists else self.negative_ttl):
+                    result[path] = cached
+                else:
+                    pending.append(path)
+        if not pending:
+            return result
+        if len(pending) == 1:
+            statuses = [_stat_path(pending[0])]
+        else:
+            statuses = list(self._pool().map(_stat_path, pending))
+        with self._lock:
+            for status in statuses:
+                self._entries[status.path] = status
+                result[status.path] = status
+        return result
+
+    def invalidate(self, paths: Optional[Iterable[str]] = None) -> None:
+        with self._lock:
+            if paths is None:
+                self._entries.clear()
+                return
+            for path in paths:
+                self._entries.pop(path, None)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="path-status")
+            return self._executor
+
+
+def _stat_path(path: str) -> PathStatus:
+    now = time.monotonic()
+    if not path:
+        return PathStatus(path=path, exists=False, checked_at=now)
+    try:
+        result = os.stat(path)
+    except (OSError, ValueError):
+        return PathStatus(path=path, exists=False, checked_at=now)
+    return PathStatus(path=path, exists=True, is_dir=stat.S_ISDIR(result.st_mode), checked_at=now)
+
+
+path_status_cache = PathStatusCache()
+
+
+def check_paths(paths: Iterable[str], refresh: bool = False) -> Dict[str, PathStatus]:
+    """一次批量获取多个附件路径的状态"""
+    return path_status_cache.check_many(paths, refresh=refresh)
 
 
 def open_local_file(path: str) -> None:
@@ -36,11 +131,8 @@ def normalize_file_paths(text: str) -> List[str]:
 
 
 def resolve_missing_paths(paths: List[str]) -> List[str]:
-    missing = []
-    for path in paths:
-        if not Path(path).exists():
-            missing.append(path)
-    return missing
+    statuses = check_paths(paths)
+    return [path for path in paths if not statuses[path].exists]
 
 
 def select_local_folder() -> str:
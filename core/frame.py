@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .enums import STATUSES
+from .models import Project
+
+# 状态、承办律师、阶段的取值很少，按分类列存储，筛选和计数都在整数编码上进行
+CATEGORY_COLUMNS = ("status", "lawyer", "stage")
+FRAME_ORDER_FIELDS = ["updated_at", "created_at", "name", "client", "lawyer", "stage", "completion", "status"]
+
+
+class ProjectFrame:
+    """项目的列式投影（pandas DataFrame，以项目编号为索引），供表格视图做向量化的筛选、计数和排序。
+
+    作为索引附加到仓库上：重新加载时记下全部项目，单条写入只记入待合并表，
+    下次读取 frame() 时才构建或合并——删除改动过的行后追加新行，不逐行修改 DataFrame。
+    返回的 DataFrame 在数据变化后会被替换而不是原地修改，调用方可以直接缓存。
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._frame: Optional[pd.DataFrame] = None
+        self._source: List[Project] = []
+        # 项目编号 → 最新的项目，None 表示已删除
+        self._pending: Dict[str, Optional[Project]] = {}
+        self.builds = 0
+        self.merges = 0
+
+    def __len__(self) -> int:
+        return len(self.frame())
+
+    def rebuild(self, projects: Iterable[Project]) -> None:
+        with self._lock:
+            self._source = list(projects)
+            self._pending.clear()
+            self._frame = None
+
+    def add(self, project: Project) -> None:
+        with self._lock:
+            self._pending[project.id] = project
+
+    def remove(self, project_id: str) -> None:
+        with self._lock:
+            self._pending[project_id] = None
+
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            if self._frame is None:
+                self._frame = _build(self._source)
+                self._source = []
+                self.builds += 1
+            if self._pending:
+                self._frame = _merge(self._frame, self._pending)
+                self._pending = {}
+                self.merges += 1
+            return self._frame
+
+    def categories(self, column: str) -> List[str]:
+        """分类列中实际出现过的取值，用作筛选选项"""
+        counts = self.frame()[column].value_counts(sort=False)
+        return [str(value) for value, count in counts.items() if value and count]
+
+    def select(
+        self,
+        status: Optional[str] = None,
+        lawyers: Sequence[str] = (),
+        stages: Sequence[str] = (),
+        ids: Optional[Iterable[str]] = None,
+        order_by: str = "-updated_at",
+    ) -> pd.DataFrame:
+        """按条件筛选并排序；ids 为关键词检索命中的项目编号，None 表示不限。order_by 前缀 "-" 表示倒序"""
+        field = order_by.lstrip("-")
+        if field not in FRAME_ORDER_FIELDS:
+            raise ValueError(f"不支持的排序字段：{order_by}")
+        frame = self.frame()
+        mask = np.ones(len(frame), dtype=bool)
+        if status:
+            mask &= (frame["status"] == status).to_numpy()
+        if lawyers:
+            mask &= frame["lawyer"].isin(lawyers).to_numpy()
+        if stages:
+            mask &= frame["stage"].isin(stages).to_numpy()
+        if ids is not None:
+            mask &= frame.index.isin(list(ids))
+        selected = frame[mask]
+        # 与仓库的排序一致：相同取值再按项目编号排列，结果稳定
+        return selected.sort_values(
+            [field, "id"],
+            ascending=not order_by.startswith("-"),
+            kind="stable",
+        )
+
+    @staticmethod
+    def counts(frame: pd.DataFrame, column: str = "status") -> Dict[str, int]:
+        counts = frame[column].value_counts(sort=False)
+        return {str(value): int(count) for value, count in counts.items() if count}
+
+
+def _build(projects: List[Project]) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "name": [project.name for project in projects],
+            "client": [project.client for project in projects],
+            "opponent": [project.opponent for project in projects],
+            "lawyer": pd.Categorical([project.lawyer for project in projects]),
+            "stage": pd.Categorical([project.stage for project in projects]),
+            "completion": np.fromiter((project.completion for project in projects), dtype=np.int16, count=len(projects)),
+            "status": _status_column([project.status for project in projects]),
+            "created_at": [project.created_at for project in projects],
+            # 与 ProjectIndex 相同，没有更新时间时按创建时间排序
+            "updated_at": [project.updated_at or project.created_at for project in projects],
+        },
+        index=pd.Index([project.id for project in projects], name="id", dtype=object),
+    )
+
+
+def _status_column(values: List[str]) -> pd.Categorical:
+    # 状态按看板列的顺序排序；历史数据中的未知状态排在最后
+    extras = sorted(set(values).difference(STATUSES))
+    return pd.Categorical(values, categories=STATUSES + extras, ordered=True)
+
+
+def _merge(frame: pd.DataFrame, pending: Dict[str, Optional[Project]]) -> pd.DataFrame:
+    kept = frame[~frame.index.isin(list(pending))]
+    changed = [project for project in pending.values() if project is not None]
+    if not changed:
+        return kept
+    extra = _build(changed)
+    # 两部分的分类取值合并后再拼接，否则拼接结果会退化为普通的对象列
+    for column in CATEGORY_COLUMNS:
+        if column == "status":
+            categories = _status_column(list(kept[column].cat.categories) + list(extra[column].cat.categories)).categories
+        else:
+            categories = kept[column].cat.categories.union(extra[column].cat.categories)
+        kept = kept.assign(**{column: kept[column].cat.set_categories(categories)})
+        extra = extra.assign(**{column: extra[column].cat.set_categories(categories)})
+    return pd.concat([kept, extra])
@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Protocol, Set, Tuple
+
+from .models import Project
+
+SortEntry = Tuple[str, str]
+
+
+class Index(Protocol):
+    """由 ProjectRepository 在重新加载和每次写入时同步维护的派生结构"""
+
+    def rebuild(self, projects: Iterable[Project]) -> None: ...
+
+    def add(self, project: Project) -> None: ...
+
+    def remove(self, project_id: str) -> None: ...
+
+
+def sort_key(project: Project) -> SortEntry:
+    return (project.updated_at or project.created_at, project.id)
+
+
+class ProjectIndex:
+    """项目的内存索引：按更新时间排序的有序表 + 状态/承办律师的哈希索引，写入时增量维护"""
+
+    def __init__(self) -> None:
+        self._order: List[SortEntry] = []
+        self._entries: Dict[str, SortEntry] = {}
+        self._status: Dict[str, str] = {}
+        self._lawyer: Dict[str, str] = {}
+        self.by_status: Dict[str, Set[str]] = {}
+        self.by_lawyer: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def rebuild(self, projects: Iterable[Project]) -> None:
+        self._entries.clear()
+        self._status.clear()
+        self._lawyer.clear()
+        self.by_status.clear()
+        self.by_lawyer.clear()
+        for project in projects:
+            entry = sort_key(project)
+            self._entries[project.id] = entry
+            self._link(project)
+        self._order = sorted(self._entries.values())
+
+    def add(self, project: Project) -> None:
+        self.remove(project.id)
+        entry = sort_key(project)
+        self._entries[project.id] = entry
+        insort(self._order, entry)
+        self._link(project)
+
+    def remove(self, project_id: str) -> None:
+        entry = self._entries.pop(project_id, None)
+        if entry is None:
+            return
+        position = bisect_left(self._order, entry)
+        if position < len(self._order) and self._order[position] == entry:
+            del self._order[position]
+        self._unlink(self.by_status, self._status.pop(project_id), project_id)
+        self._unlink(self.by_lawyer, self._lawyer.pop(project_id), project_id)
+
+    def count(self, status: Optional[str] = None) -> int:
+        if status is None:
+            return len(self._entries)
+        return len(self.by_status.get(status, ()))
+
+    def newest_first(self) -> Iterator[str]:
+        for _, project_id in reversed(self._order):
+            yield project_id
+
+    def oldest_first(self) -> Iterator[str]:
+        for _, project_id in self._order:
+            yield project_id
+
+    def sorted_ids(self, project_ids: Iterable[str], newest_first: bool = True) -> List[str]:
+        entries = self._entries
+        return sorted(project_ids, key=entries.__getitem__, reverse=newest_first)
+
+    def candidates(self, status: Optional[str] = None, lawyer: Optional[str] = None) -> Optional[Set[str]]:
+        """返回满足状态/承办律师条件的 id 集合；未指定条件时为 None，表示全部"""
+        sets = []
+        if status is not None:
+            sets.append(self.by_status.get(status, set()))
+        if lawyer is not None:
+            sets.append(self.by_lawyer.get(lawyer, set()))
+        if not sets:
+            return None
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:]) if len(sets) > 1 else sets[0]
+
+    def _link(self, project: Project) -> None:
+        self._status[project.id] = project.status
+        self._lawyer[project.id] = project.lawyer
+        self.by_status.setdefault(project.status, set()).add(project.id)
+        self.by_lawyer.setdefault(project.lawyer, set()).add(project.id)
+
+    @staticmethod
+    def _unlink(index: Dict[str, Set[str]], value: str, project_id: str) -> None:
+        bucket = index.get(value)
+        if bucket is None:
+            return
+        bucket.discard(project_id)
+        if not bucket:
+            del index[value]
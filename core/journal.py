@@ -0,0 +1,204 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import ContextManager, Dict, List, Optional
+
+from .json_stream import RecordError
+from .storage import JsonStorage, Signature, stat_signature, write_json_atomic
+
+DEFAULT_MAX_RECORDS = 500
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024
+
+
+class JournalStorage:
+    """追加式日志存储：快照沿用 projects.json 的格式，每次增删改只追加一行日志。
+
+    日志超过条数或大小阈值后会被轮转为 ``.compacting``，由后台线程合并进快照。
+    加载顺序为 快照 → 合并中的日志 → 当前日志，重放是幂等的，
+    因此合并过程中崩溃也不会丢失数据。
+
+    多个进程共享数据目录时，追加、轮转和合并写入都持有 ``.lock`` 文件的 fcntl 排他锁，
+    加载持有共享锁：避免一个进程向 ``.compacting`` 追加日志时另一个进程正在合并并删除它。
+    该锁与快照（JsonStorage）共用，先于 self._lock 获取。
+    """
+
+    incremental = True
+
+    def __init__(
+        self,
+        path: Path,
+        max_records: int = DEFAULT_MAX_RECORDS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.snapshot = JsonStorage(path)
+        self.path = path
+        self.journal_path = path.with_name(f"{path.name}.journal")
+        self.compacting_path = path.with_name(f"{path.name}.compacting")
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._repair_tail(self.journal_path)
+        self._records = self._count_records(self.journal_path)
+
+    @property
+    def load_errors(self) -> List[RecordError]:
+        return self.snapshot.load_errors
+
+    def signature(self) -> Optional[Signature]:
+        parts = []
+        for path in (self.path, self.compacting_path, self.journal_path):
+            parts.extend(stat_signature(path) or (0, 0, 0))
+        return tuple(parts)
+
+    def load(self) -> List[dict]:
+        with self._file_lock(exclusive=False), self._lock:
+            items: Dict[str, dict] = {}
+            for item in self.snapshot.load():
+                items.setdefault(item.get("id", ""), item)
+            self._replay(self.compacting_path, items)
+            self._replay(self.journal_path, items)
+        return list(items.values())
+
+    def save(self, data: List[dict]) -> None:
+        """整体重写快照并清空日志（用于全部删除等批量操作）。
+
+        不等待后台合并：调用方可能已持有文件锁，合并线程写入前会发现快照已变化而放弃。
+        """
+        with self._file_lock(), self._lock:
+            self.snapshot.preserve_corrupt()
+            write_json_atomic(self.path, data)
+            self.compacting_path.unlink(missing_ok=True)
+            self.journal_path.unlink(missing_ok=True)
+            self._records = 0
+
+    def upsert(self, item: dict) -> None:
+        self._append({"op": "put", "item": item})
+
+    def upsert_many(self, items: List[dict]) -> None:
+        """批量写入只追加一次、fsync 一次"""
+        self._append_many([{"op": "put", "item": item} for item in items])
+
+    def remove(self, project_id: str) -> None:
+        self._append({"op": "delete", "id": project_id})
+
+    def compact(self) -> None:
+        """同步合并日志，返回前快照已包含全部记录"""
+        self.wait_for_compaction()
+        with self._file_lock(), self._lock:
+            self._rotate()
+        self._merge()
+
+    def write_lock(self) -> ContextManager[None]:
+        return self._file_lock()
+
+    def wait_for_compaction(self) -> None:
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def _append(self, record: dict) -> None:
+        self._append_many([record])
+
+    def _append_many(self, records: List[dict]) -> None:
+        text = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+        with self._file_lock(), self._lock:
+            with self.journal_path.open("a", encoding="utf-8") as handle:
+                handle.write(text)
+                handle.flush()
+                os.fsync(handle.fileno())
+            self._records += len(records)
+            if self._needs_compaction():
+                self._start_compaction()
+
+    def _needs_compaction(self) -> bool:
+        if self._records >= self.max_records:
+            return True
+        size = stat_signature(self.journal_path)
+        return size is not None and size[1] >= self.max_bytes
+
+    def _start_compaction(self) -> None:
+        # 调用方已持有 self._lock 和文件锁
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        if not self._rotate():
+            return
+        self._compactor = threading.Thread(target=self._merge, name="journal-compactor", daemon=True)
+        self._compactor.start()
+
+    def _rotate(self) -> bool:
+        """把当前日志改名为待合并日志，之后的追加写入新的日志文件"""
+        if self.compacting_path.exists():
+            # 上次合并未完成（例如进程崩溃），先把新日志追加进去一并合并
+            if self.journal_path.exists():
+                with self.compacting_path.open("a", encoding="utf-8") as target:
+                    with self.journal_path.open("r", encoding="utf-8") as source:
+                        target.write(source.read())
+                self.journal_path.unlink()
+        elif self.journal_path.exists():
+            os.replace(self.journal_path, self.compacting_path)
+        else:
+            return False
+        self._records = 0
+        return True
+
+    def _merge(self) -> None:
+        # 读取和合并不持锁；写入前在锁内确认快照和待合并日志未被其它进程改动，否则重新合并
+        while True:
+            expected = (stat_signature(self.path), stat_signature(self.compacting_path))
+            if expected[1] is None:
+                # 已被其它进程合并
+                return
+            items: Dict[str, dict] = {}
+            for item in self.snapshot.load():
+                items.setdefault(item.get("id", ""), item)
+            self._replay(self.compacting_path, items)
+            with self._file_lock(), self._lock:
+                if (stat_signature(self.path), stat_signature(self.compacting_path)) != expected:
+                    continue
+                self.snapshot.preserve_corrupt()
+                write_json_atomic(self.path, list(items.values()))
+                self.compacting_path.unlink(missing_ok=True)
+                return
+
+    def _file_lock(self, exclusive: bool = True) -> ContextManager[None]:
+        return self.snapshot.lock.hold(exclusive)
+
+    @staticmethod
+    def _replay(path: Path, items: Dict[str, dict]) -> None:
+        if not path.exists():
+            return
+        with path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 崩溃时最后一行可能只写了一半，跳过即可
+                    continue
+                op = record.get("op")
+                if op == "put":
+                    item = record.get("item") or {}
+                    items.pop(item.get("id", ""), None)
+                    items[item.get("id", "")] = item
+                elif op == "delete":
+                    items.pop(record.get("id", ""), None)
+
+    @staticmethod
+    def _repair_tail(path: Path) -> None:
+        """崩溃后日志末尾可能缺少换行，补上以免下一条记录与残行粘连"""
+        if not path.exists() or path.stat().st_size == 0:
+            return
+        with path.open("rb+") as handle:
+            handle.seek(-1, os.SEEK_END)
+            if handle.read(1) != b"\n":
+                handle.write(b"\n")
+
+    @staticmethod
+    def _count_records(path: Path) -> int:
+        if not path.exists():
+            return 0
+        with path.open("rb") as handle:
+            return sum(1 for _ in handle)
@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import IO, Callable, Iterator, List, Optional, Pattern
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+# 单条记录超过该长度仍无法解析时视为损坏，避免把文件剩余部分全部读入内存
+DEFAULT_MAX_RECORD_CHARS = 16 * 1024 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+# 损坏记录之后重新对齐：下一个以逗号分隔、以 { 开头的元素
+_NEXT_OBJECT = re.compile(r",[ \t\n\r]*(?=\{)")
+
+
+@dataclass(frozen=True)
+class RecordError:
+    offset: int
+    line: int
+    message: str
+
+    def __str__(self) -> str:
+        return f"第 {self.line} 行（字符偏移 {self.offset}）：{self.message}"
+
+
+class _Reader:
+    """按块读取文本，维护缓冲区在整个文件中的字符偏移和行号"""
+
+    def __init__(self, handle: IO[str], chunk_size: int, errors: List[RecordError]) -> None:
+        self.handle = handle
+        self.chunk_size = chunk_size
+        self.errors = errors
+        self.buffer = ""
+        self.position = 0
+        self.base = 0
+        self.line = 1
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        try:
+            chunk = self.handle.read(self.chunk_size)
+        except UnicodeDecodeError:
+            self.eof = True
+            self.errors.append(self.error("文件包含无效的 UTF-8 字节，其后的内容无法读取", len(self.buffer)))
+            return False
+        if not chunk:
+            self.eof = True
+            return False
+        # 丢弃已经解析过的部分，缓冲区只保留未处理的文本
+        consumed = self.buffer[: self.position]
+        self.line += consumed.count("\n")
+        self.base += self.position
+        self.buffer = self.buffer[self.position :] + chunk
+        self.position = 0
+        return True
+
+    def skip_whitespace(self) -> None:
+        while True:
+            self.position = _WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or not self.fill():
+                return
+
+    def peek(self) -> str:
+        self.skip_whitespace()
+        return self.buffer[self.position : self.position + 1]
+
+    def error(self, message: str, position: Optional[int] = None) -> RecordError:
+        position = self.position if position is None else position
+        line = self.line + self.buffer.count("\n", 0, position)
+        return RecordError(offset=self.base + position, line=line, message=message)
+
+
+def iter_json_array(
+    handle: IO[str],
+    errors: Optional[List[RecordError]] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    max_record_chars: int = DEFAULT_MAX_RECORD_CHARS,
+    validate: Optional[Callable[[dict], Optional[str]]] = None,
+) -> Iterator[dict]:
+    """逐条解析顶层 JSON 数组中的对象，内存占用只与单条记录的大小有关。
+
+    无法解析、不是对象或未通过 validate（返回错误信息）的记录会跳过，并把带偏移量的错误追加到 errors；
+    文件末尾被截断时，截断前的完整记录仍会全部返回。
+    """
+    if errors is None:
+        errors = []
+    decoder = json.JSONDecoder()
+    reader = _Reader(handle, chunk_size, errors)
+    if reader.peek() != "[":
+        if reader.peek():
+            errors.append(reader.error("顶层不是 JSON 数组"))
+        return
+    reader.position += 1
+    opening = reader.position
+    if reader.peek() == "]":
+        return
+    # 格式化输出的文件中顶层记录有固定缩进，据此重新对齐可以避免误入嵌套的附件对象
+    indent = reader.buffer[opening : reader.position] if reader.base == 0 else ""
+    boundary = re.compile("," + re.escape(indent) + r"(?=\{)") if "\n" in indent else _NEXT_OBJECT
+    # 紧凑格式下重新对齐的候选位置可能落在嵌套对象中，直到遇到有效记录前都不再重复报错
+    ambiguous = boundary is _NEXT_OBJECT
+    resyncing = False
+    while True:
+        reader.skip_whitespace()
+        start = reader.position
+        try:
+            item, end = decoder.raw_decode(reader.buffer, start)
+        except json.JSONDecodeError as exc:
+            # 出错位置之后还没有出现下一条记录的开头，说明记录可能只是跨越了读取块的边界，补充数据后重试
+            incomplete = boundary.search(reader.buffer, exc.pos) is None
+            if incomplete and len(reader.buffer) - start < max_record_chars and reader.fill():
+                continue
+            if reader.eof and not reader.buffer[exc.pos :].strip():
+                if not (resyncing and ambiguous):
+                    errors.append(reader.error("文件在此处被截断", start))
+                return
+            if not (resyncing and ambiguous):
+                errors.append(reader.error(f"无法解析的记录：{exc.msg}", start))
+            resyncing = True
+            if not _resync(reader, boundary, start):
+                return
+            continue
+        if end >= len(reader.buffer) and reader.fill():
+            # 数字等标量可能恰好在块末尾被截断，补充数据后重新解析
+            continue
+        problem = "记录不是 JSON 对象" if not isinstance(item, dict) else validate(item) if validate else None
+        if problem is not None and resyncing and ambiguous:
+            if not _resync(reader, boundary, start):
+                return
+            continue
+        resyncing = False
+        if problem is None:
+            yield item
+        else:
+            errors.append(reader.error(problem, start))
+        reader.position = end
+        separator = reader.peek()
+        if separator == ",":
+            reader.position += 1
+        elif separator == "]":
+            return
+        elif not separator:
+            errors.append(reader.error("文件在此处被截断"))
+            return
+        else:
+            errors.append(reader.error(f"记录之间缺少逗号（遇到 {separator!r}）"))
+            resyncing = True
+            if not _resync(reader, boundary, reader.position):
+                return
+
+
+def _resync(reader: _Reader, boundary: Pattern[str], start: int) -> bool:
+    """跳到下一条记录的开头；找不到时返回 False"""
+    search_from = start + 1
+    while True:
+        match = boundary.search(reader.buffer, search_from)
+        if match is not None:
+            reader.position = match.end()
+            return True
+        # 逗号和其后的空白可能恰好位于块边界，保留下来与下一块一起匹配
+        keep = reader.buffer.rfind(",", search_from)
+        if keep < 0 or reader.buffer[keep + 1 :].strip(" \t\n\r"):
+            keep = len(reader.buffer)
+        reader.position = keep
+        if not reader.fill():
+            return False
+        search_from = 0
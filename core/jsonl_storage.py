@@ -0,0 +1,384 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import BinaryIO, ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .storage import FileLock, Signature, create_temp, stat_signature
+
+# 索引文件布局：头部 (魔数, 版本, 数据文件 inode, 已覆盖的数据长度, 存活行总字节数, 条目数)，
+# 之后是按 id 哈希排序的定长条目 (id 哈希, 行偏移, 行长度)，启动时整体 mmap，按二分查找定位
+INDEX_MAGIC = b"PJIX"
+INDEX_VERSION = 1
+_HEADER = struct.Struct("<4sIQQQQ")
+_ENTRY = struct.Struct("<QQI")
+
+DEFAULT_MIN_COMPACT_BYTES = 1024 * 1024
+DEFAULT_MAX_TAIL_RECORDS = 5000
+# 删除记录以墓碑行表示
+DELETED_KEY = "_deleted"
+
+Location = Tuple[int, int]
+# (id 哈希, 行偏移, 行长度)
+Entry = Tuple[int, int, int]
+
+
+def id_hash(project_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(project_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+# 复用同一个编码器，批量写入时不必每行重新构造
+_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _encode_line(item: dict) -> bytes:
+    return (_ENCODER.encode(item) + "\n").encode("utf-8")
+
+
+class JsonlStorage:
+    """JSON Lines 存储：每行一个项目，修改时追加新行，旁路索引记录 id → (字节偏移, 长度)。
+
+    索引按 id 哈希排序，打开时 mmap，get() 只需二分查找后读取一行；
+    索引生成之后追加的行（“尾部”）在打开时扫描进内存表。
+    失效行超过一半或尾部过长时，由后台线程把存活的行原样复制到新文件并重建索引。
+    追加、合并和重写都持有旁路 .lock 文件的排他锁，多个进程可以同时写入；读取不加锁，会跟上其它进程的追加和合并。
+    """
+
+    incremental = True
+
+    def __init__(
+        self,
+        path: Path,
+        min_compact_bytes: int = DEFAULT_MIN_COMPACT_BYTES,
+        max_tail_records: int = DEFAULT_MAX_TAIL_RECORDS,
+    ) -> None:
+        self.path = path
+        self.index_path = path.with_name(f"{path.name}.idx")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.touch(exist_ok=True)
+        self.min_compact_bytes = min_compact_bytes
+        self.max_tail_records = max_tail_records
+        self._lock = threading.RLock()
+        self.lock = FileLock(path.with_name(f"{path.name}.lock"))
+        self._compactor: Optional[threading.Thread] = None
+        self._index: Optional[mmap.mmap] = None
+        # 当前数据文件的只读句柄：文件被替换后只要句柄未关闭，新文件就不会复用它的 inode，
+        # 按 inode 判断文件是否被替换才可靠；偏移量也总是针对这份文件读取
+        self._data: Optional[BinaryIO] = None
+        self._index_count = 0
+        self._inode = -1
+        self._end = 0
+        # 索引之后追加的行：id → 位置，None 表示已删除
+        self._tail: Dict[str, Optional[Location]] = {}
+        self._live_bytes = 0
+        self._open()
+
+    def signature(self) -> Optional[Signature]:
+        return stat_signature(self.path)
+
+    def load(self) -> List[dict]:
+        with self._lock:
+            self._sync()
+            items: Dict[str, dict] = {}
+            with self.path.open("rb") as handle:
+                for line in handle:
+                    item = _decode_line(line)
+                    if item is None:
+                        continue
+                    project_id = item.get("id", "")
+                    items.pop(project_id, None)
+                    if not item.get(DELETED_KEY):
+                        items[project_id] = item
+            return list(items.values())
+
+    def get(self, project_id: str) -> Optional[dict]:
+        """按 id 读取单个项目，耗时与项目总数无关"""
+        with self._lock:
+            self._sync()
+            location = self._locate(project_id)
+            if location is None:
+                return None
+            item = _decode_line(_read_at(self._data, *location))
+        if item is None or item.get("id") != project_id or item.get(DELETED_KEY):
+            return None
+        return item
+
+    def save(self, data: List[dict]) -> None:
+        """整体重写数据文件和索引（用于全部删除等批量操作）。
+
+        不等待后台合并：调用方可能已持有文件锁，合并线程拿到锁后会跟上重写后的文件。
+        """
+        with self.lock.hold(), self._lock:
+            self._rewrite((id_hash(item.get("id", "")), _encode_line(item)) for item in data)
+
+    def upsert(self, item: dict) -> None:
+        self._append([(item.get("id", ""), _encode_line(item), False)])
+
+    def upsert_many(self, items: List[dict]) -> None:
+        """批量写入只追加一次、fsync 一次"""
+        self._append([(item.get("id", ""), _encode_line(item), False) for item in items])
+
+    def remove(self, project_id: str) -> None:
+        self._append([(project_id, _encode_line({"id": project_id, DELETED_KEY: True}), True)])
+
+    def compact(self) -> None:
+        """同步合并，返回后数据文件只包含存活的行"""
+        self.wait_for_compaction()
+        self._compact()
+
+    def write_lock(self) -> ContextManager[None]:
+        return self.lock.hold()
+
+    def wait_for_compaction(self) -> None:
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "indexed": self._index_count,
+                "tail": len(self._tail),
+                "file_bytes": self._end,
+                "live_bytes": self._live_bytes,
+            }
+
+    def _append(self, records: List[Tuple[str, bytes, bool]]) -> None:
+        """records 为 (项目编号, 行, 是否删除)，一次写入并 fsync"""
+        with self.lock.hold(), self._lock:
+            # 持有文件锁后重新读取文件长度和尾部，其它进程此前追加的行都已计入 self._end
+            self._sync()
+            with self.path.open("r+b") as handle:
+                # 此时没有其它写入者，末尾若还有半行只能是崩溃遗留的，先截掉，保证新行从 self._end 开始
+                handle.truncate(self._end)
+                handle.seek(self._end)
+                handle.write(b"".join(line for _, line, _ in records))
+                handle.flush()
+                os.fsync(handle.fileno())
+            for project_id, line, deleted in records:
+                previous = self._locate(project_id)
+                if previous is not None:
+                    self._live_bytes -= previous[1]
+                if deleted:
+                    self._tail[project_id] = None
+                else:
+                    self._tail[project_id] = (self._end, len(line))
+                    self._live_bytes += len(line)
+                self._end += len(line)
+            if self._needs_compaction():
+                self._start_compaction()
+
+    def _needs_compaction(self) -> bool:
+        if len(self._tail) >= self.max_tail_records:
+            return True
+        return self._end >= self.min_compact_bytes and self._end > 2 * self._live_bytes
+
+    def _start_compaction(self) -> None:
+        # 调用方已持有 self._lock
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self._compact, name="jsonl-compactor", daemon=True)
+        self._compactor.start()
+
+    def _compact(self) -> None:
+        with self.lock.hold(), self._lock:
+            self._sync()
+            entries = sorted(self._live_entries(self._data), key=lambda entry: entry[1])
+            self._rewrite((key, _read_at(self._data, offset, length)) for key, offset, length in entries)
+
+    def _live_entries(self, handle: BinaryIO) -> Iterator[Entry]:
+        """索引中被尾部覆盖（更新或删除）的条目需要读出 id 才能确认，其余条目直接沿用"""
+        overridden = {id_hash(project_id) for project_id in self._tail}
+        for position in range(self._index_count):
+            key, offset, length = _ENTRY.unpack_from(self._index, _HEADER.size + position * _ENTRY.size)
+            if key in overridden:
+                item = _decode_line(_read_at(handle, offset, length))
+                if item is None or item.get("id", "") in self._tail:
+                    continue
+            yield key, offset, length
+        for project_id, location in self._tail.items():
+            if location is not None:
+                yield (id_hash(project_id), *location)
+
+    def _rewrite(self, records: Iterable[Tuple[int, bytes]]) -> None:
+        """写出只含存活行的新数据文件和索引；先写索引再替换数据文件，中途崩溃时 inode 对不上，打开时会重建索引"""
+        fd, temp_path = create_temp(self.path)
+        entries: List[Entry] = []
+        offset = 0
+        try:
+            with os.fdopen(fd, "wb") as handle:
+                for key, line in records:
+                    handle.write(line)
+                    entries.append((key, offset, len(line)))
+                    offset += len(line)
+                handle.flush()
+                os.fsync(handle.fileno())
+                inode = os.fstat(handle.fileno()).st_ino
+            _write_index(self.index_path, inode, offset, offset, entries)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            temp_path.unlink(missing_ok=True)
+            raise
+        self._close_index()
+        self._open()
+
+    def _build_index(self, handle: BinaryIO) -> None:
+        """没有可用索引时全量扫描一遍数据文件，为每个 id 最后一次写入的行建立索引，不改动数据文件"""
+        latest: Dict[str, Optional[Location]] = {}
+        inode = os.fstat(handle.fileno()).st_ino
+        handle.seek(0)
+        offset = 0
+        for line in handle:
+            if not line.endswith(b"\n"):
+                break
+            item = _decode_line(line)
+            if item is not None:
+                project_id = item.get("id", "")
+                latest[project_id] = None if item.get(DELETED_KEY) else (offset, len(line))
+            offset += len(line)
+        entries = [(id_hash(project_id), *location) for project_id, location in latest.items() if location is not None]
+        _write_index(self.index_path, inode, offset, sum(entry[2] for entry in entries), entries)
+
+    def _open(self) -> None:
+        """映射索引并扫描索引之后追加的行；索引缺失或与数据文件不匹配时重建索引"""
+        handle = self.path.open("rb")
+        if self._data is not None:
+            self._data.close()
+        self._data = handle
+        stat = os.fstat(handle.fileno())
+        header = self._map_index()
+        attempts = 0
+        while header is None or header[2] != stat.st_ino or header[3] > stat.st_size:
+            # 重建期间其它进程可能刚好合并并写入了新文件的索引，重试几次
+            if attempts == 3:
+                raise OSError(f"无法读取索引文件：{self.index_path}")
+            self._close_index()
+            self._build_index(handle)
+            header = self._map_index()
+            attempts += 1
+        self._inode = header[2]
+        self._end = header[3]
+        self._live_bytes = header[4]
+        self._index_count = header[5]
+        self._tail = {}
+        self._scan_tail()
+
+    def _map_index(self) -> Optional[Tuple[bytes, int, int, int, int, int]]:
+        try:
+            with self.index_path.open("rb") as handle:
+                size = os.fstat(handle.fileno()).st_size
+                if size < _HEADER.size:
+                    return None
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            return None
+        header = _HEADER.unpack_from(mapped, 0)
+        if header[0] != INDEX_MAGIC or header[1] != INDEX_VERSION or size != _HEADER.size + header[5] * _ENTRY.size:
+            mapped.close()
+            return None
+        self._index = mapped
+        return header
+
+    def _close_index(self) -> None:
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+        self._index_count = 0
+
+    def _sync(self) -> None:
+        """其它进程追加或合并了数据文件时，跟上它们的修改"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self.path.touch()
+            stat = os.stat(self.path)
+        if stat.st_ino != self._inode:
+            self._close_index()
+            self._open()
+        elif stat.st_size > self._end:
+            self._scan_tail()
+
+    def _scan_tail(self) -> None:
+        handle = self._data
+        handle.seek(self._end)
+        offset = self._end
+        for line in handle:
+            if not line.endswith(b"\n"):
+                # 其它进程正在写入的半行，下次再读
+                break
+            item = _decode_line(line)
+            if item is not None:
+                project_id = item.get("id", "")
+                previous = self._locate(project_id)
+                if previous is not None:
+                    self._live_bytes -= previous[1]
+                if item.get(DELETED_KEY):
+                    self._tail[project_id] = None
+                else:
+                    self._tail[project_id] = (offset, len(line))
+                    self._live_bytes += len(line)
+            offset += len(line)
+        self._end = offset
+
+    def _locate(self, project_id: str) -> Optional[Location]:
+        if project_id in self._tail:
+            return self._tail[project_id]
+        if self._index is None or not self._index_count:
+            return None
+        key = id_hash(project_id)
+        low, high = 0, self._index_count
+        while low < high:
+            middle = (low + high) // 2
+            if _ENTRY.unpack_from(self._index, _HEADER.size + middle * _ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        candidates = []
+        while low < self._index_count:
+            entry_key, offset, length = _ENTRY.unpack_from(self._index, _HEADER.size + low * _ENTRY.size)
+            if entry_key != key:
+                break
+            candidates.append((offset, length))
+            low += 1
+        if len(candidates) == 1:
+            return candidates[0]
+        # 哈希冲突极少见，逐个读取比对 id
+        for offset, length in candidates:
+            item = _decode_line(_read_at(self._data, offset, length))
+            if item is not None and item.get("id") == project_id:
+                return (offset, length)
+        return None
+
+
+def _decode_line(line: bytes) -> Optional[dict]:
+    try:
+        item = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        # 崩溃时最后一行可能只写了一半，跳过即可
+        return None
+    return item if isinstance(item, dict) else None
+
+
+def _read_at(handle: BinaryIO, offset: int, length: int) -> bytes:
+    handle.seek(offset)
+    return handle.read(length)
+
+
+def _write_index(path: Path, inode: int, covered: int, live_bytes: int, entries: List[Entry]) -> None:
+    entries.sort()
+    fd, temp_path = create_temp(path)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, inode, covered, live_bytes, len(entries)))
+            handle.write(b"".join(_ENTRY.pack(*entry) for entry in entries))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import hashlib
+import heapq
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from .models import Project
+from .storage import write_json_atomic
+
+DEFAULT_MAX_WORKERS = 4
+DEFAULT_INTERVAL = 300.0
+# 每隔若干轮做一次全量扫描：文件原地修改不改变目录 mtime，增量扫描发现不了
+DEFAULT_FULL_EVERY = 12
+DEFAULT_RECENT_COUNT = 10
+
+
+@dataclass
+class FolderSummary:
+    root: str
+    file_count: int
+    total_size: int
+    scanned_at: str
+    # (相对路径, 大小, mtime_ns)，按修改时间倒序
+    recent: List[Tuple[str, int, int]] = field(default_factory=list)
+
+
+class ManifestStore:
+    """每个文件夹一份清单，保存在数据目录旁的 manifests/ 下"""
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def load(self, root: str) -> Optional[dict]:
+        path = self._path(root)
+        if not path.exists():
+            return None
+        try:
+            with path.open("r", encoding="utf-8") as handle:
+                data = json.load(handle)
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(data, dict) or data.get("root") != root:
+            return None
+        return data
+
+    def save(self, root: str, manifest: dict) -> None:
+        write_json_atomic(self._path(root), manifest, indent=None)
+
+    def delete(self, root: str) -> None:
+        self._path(root).unlink(missing_ok=True)
+
+    def _path(self, root: str) -> Path:
+        digest = hashlib.sha1(root.encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.json"
+
+
+def scan_folder(root: str, previous: Optional[dict] = None) -> Tuple[dict, int]:
+    """用 os.scandir 遍历文件夹，返回 (清单, 实际重新列目录的数量)。
+
+    目录的 mtime 与上次清单一致时直接沿用其文件列表，只对子目录继续下探；
+    目录内文件原地修改不会改变目录 mtime，需要时可传入 previous=None 做一次全量扫描。
+    """
+    previous_dirs = (previous or {}).get("dirs", {})
+    dirs: Dict[str, dict] = {}
+    rescanned = 0
+    stack = [""]
+    while stack:
+        relative = stack.pop()
+        full = os.path.join(root, relative) if relative else root
+        try:
+            mtime_ns = os.stat(full).st_mtime_ns
+        except OSError:
+            continue
+        entry = previous_dirs.get(relative)
+        if entry is None or entry.get("mtime_ns") != mtime_ns:
+            entry = _list_directory(full, mtime_ns)
+            rescanned += 1
+        dirs[relative] = entry
+        stack.extend(os.path.join(relative, name) if relative else name for name in entry["subdirs"])
+    manifest = {
+        "root": root,
+        "scanned_at": datetime.now().isoformat(timespec="seconds"),
+        "dirs": dirs,
+    }
+    return manifest, rescanned
+
+
+def _list_directory(path: str, mtime_ns: int) -> dict:
+    files: Dict[str, List[int]] = {}
+    subdirs: List[str] = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.is_file(follow_symlinks=False):
+                        stat = entry.stat(follow_symlinks=False)
+                        files[entry.name] = [stat.st_size, stat.st_mtime_ns, stat.st_ino]
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return {"mtime_ns": mtime_ns, "files": files, "subdirs": subdirs}
+
+
+def summarize(manifest: dict, recent_count: int = DEFAULT_RECENT_COUNT) -> FolderSummary:
+    file_count = 0
+    total_size = 0
+    entries = []
+    for relative, entry in manifest.get("dirs", {}).items():
+        for name, (size, mtime_ns, _) in entry.get("files", {}).items():
+            file_count += 1
+            total_size += size
+            entries.append((os.path.join(relative, name) if relative else name, size, mtime_ns))
+    recent = heapq.nlargest(recent_count, entries, key=lambda item: item[2])
+    return FolderSummary(
+        root=manifest.get("root", ""),
+        file_count=file_count,
+        total_size=total_size,
+        scanned_at=manifest.get("scanned_at", ""),
+        recent=recent,
+    )
+
+
+class FolderIndexer:
+    """后台为文件夹附件生成清单：新增的文件夹立即排队扫描，之后每隔 interval 秒增量重扫，
+    每 full_every 轮全量重扫一次（full_every 为 0 时不做全量扫描）。
+
+    与 ProjectIndex 相同，实现 rebuild/add/remove，由 ProjectRepository.attach 注册。
+    """
+
+    def __init__(
+        self,
+        store_dir: Path,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        interval: float = DEFAULT_INTERVAL,
+        recent_count: int = DEFAULT_RECENT_COUNT,
+        full_every: int = DEFAULT_FULL_EVERY,
+    ) -> None:
+        self.store = ManifestStore(store_dir)
+        self.interval = interval
+        self.full_every = full_every
+        self.recent_count = recent_count
+        self._lock = threading.Lock()
+        self._owners: Dict[str, Set[str]] = {}
+        self._project_folders: Dict[str, List[str]] = {}
+        self._summaries: Dict[str, FolderSummary] = {}
+        self._scanning: Dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="folder-indexer")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def rebuild(self, projects: Iterable[Project]) -> None:
+        projects = list(projects)
+        current = {project.id for project in projects}
+        for project_id in [item for item in self._project_folders if item not in current]:
+            self.remove(project_id)
+        for project in projects:
+            self.add(project)
+
+    def add(self, project: Project) -> None:
+        folders = list(dict.fromkeys(file.path for file in project.files if file.is_folder and file.path))
+        with self._lock:
+            old = self._project_folders.pop(project.id, [])
+            if folders:
+                self._project_folders[project.id] = folders
+            for root in old:
+                if root not in folders:
+                    self._release(root, project.id)
+            added = []
+            for root in folders:
+                owners = self._owners.setdefault(root, set())
+                if not owners:
+                    added.append(root)
+                owners.add(project.id)
+        self.refresh(added)
+
+    def remove(self, project_id: str) -> None:
+        with self._lock:
+            for root in self._project_folders.pop(project_id, []):
+                self._release(root, project_id)
+
+    def summary(self, root: str) -> Optional[FolderSummary]:
+        """返回文件夹概况；内存中没有时读取侧车清单，不访问被索引的文件夹本身"""
+        with self._lock:
+            cached = self._summaries.get(root)
+        if cached is not None:
+            return cached
+        manifest = self.store.load(root)
+        if manifest is None:
+            return None
+        result = summarize(manifest, self.recent_count)
+        with self._lock:
+            self._summaries[root] = result
+        return result
+
+    def is_scanning(self, root: str) -> bool:
+        with self._lock:
+            return root in self._scanning
+
+    def refresh(self, roots: Optional[Iterable[str]] = None, full: bool = False, wait: bool = False) -> None:
+        """把文件夹提交到线程池扫描；roots 为 None 时扫描全部已跟踪的文件夹"""
+        with self._lock:
+            targets = list(self._owners) if roots is None else [root for root in roots if root in self._owners]
+            futures = []
+            for root in targets:
+                # 正在扫描的文件夹不重复提交
+                future = self._scanning.get(root)
+                if future is None:
+                    future = self._scanning[root] = self._executor.submit(self._scan, root, full)
+                futures.append(future)
+        if wait:
+            for future in futures:
+                future.result()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="folder-indexer-timer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._executor.shutdown(wait=True)
+
+    def _run(self) -> None:
+        cycle = 0
+        while not self._stop.wait(self.interval):
+            cycle += 1
+            self.refresh(full=self.full_every > 0 and cycle % self.full_every == 0)
+
+    def _scan(self, root: str, full: bool) -> None:
+        try:
+            previous = None if full else self.store.load(root)
+            manifest, _ = scan_folder(root, previous)
+            self.store.save(root, manifest)
+            result = summarize(manifest, self.recent_count)
+            with self._lock:
+                if root in self._owners:
+                    self._summaries[root] = result
+        finally:
+            with self._lock:
+                self._scanning.pop(root, None)
+
+    def _release(self, root: str, project_id: str) -> None:
+        # 调用方已持有 self._lock；清单文件保留，文件夹重新关联时仍可增量扫描
+        owners = self._owners.get(root)
+        if owners is None:
+            return
+        owners.discard(project_id)
+        if not owners:
+            del self._owners[root]
+            self._summaries.pop(root, None)
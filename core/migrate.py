@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import uuid
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Set, TextIO, Tuple
+
+from .enums import STATUSES
+from .json_stream import RecordError, iter_json_array
+from .models import FileLink
+from .storage import JsonStorage, create_temp
+
+# 至少包含其中一个字段才被视为项目记录（而不是错位解析出的附件对象）
+PROJECT_MARKERS = ("id", "client", "opponent", "lawyer", "status", "stage", "completion")
+
+
+def upgrade_record(item: dict) -> dict:
+    """把旧版或不完整的记录转换为当前格式，缺失字段按 Project.from_dict 的规则补默认值，键顺序与 to_dict 一致"""
+    status = _text(item.get("status"))
+    created_at = _text(item.get("created_at"))
+    return {
+        "id": _text(item.get("id")) or uuid.uuid4().hex,
+        "name": _text(item.get("name")),
+        "client": _text(item.get("client")),
+        "opponent": _text(item.get("opponent")),
+        "lawyer": _text(item.get("lawyer")),
+        "stage": _text(item.get("stage")),
+        "completion": _completion(item.get("completion")),
+        "status": status if status in STATUSES else STATUSES[0],
+        "notes": _text(item.get("notes")),
+        "files": [link.to_dict() for link in _file_links(item.get("files"))],
+        "created_at": created_at,
+        "updated_at": _text(item.get("updated_at")) or created_at,
+        "version": max(_integer(item.get("version")), 0),
+    }
+
+
+def migrate_records(source: Path, errors: List[RecordError]) -> Iterator[dict]:
+    """流式读取 source 并逐条升级，重复的项目编号只保留第一条"""
+    seen: Set[str] = set()
+
+    def check(item: dict) -> Optional[str]:
+        if not any(key in item for key in PROJECT_MARKERS):
+            return "不是项目记录"
+        project_id = _text(item.get("id"))
+        if project_id and project_id in seen:
+            return f"重复的项目编号 {project_id}"
+        if project_id:
+            seen.add(project_id)
+        return None
+
+    with source.open("r", encoding="utf-8") as handle:
+        for item in iter_json_array(handle, errors, validate=check):
+            yield upgrade_record(item)
+
+
+def write_json_array(path: Path, items: Iterable[dict]) -> int:
+    """逐条写出 JSON 数组，输出与 write_json_atomic(indent=2) 完全相同；返回写出的记录数"""
+    fd, temp_path = create_temp(path)
+    count = 0
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            for item in items:
+                handle.write("[\n" if count == 0 else ",\n")
+                _write_indented(handle, item)
+                count += 1
+            handle.write("\n]" if count else "[]")
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return count
+
+
+def migrate_json_file(source: Path, target: Optional[Path] = None) -> Tuple[int, List[RecordError]]:
+    """把 source 转换为当前格式写入 target（默认原地转换，原文件保留为 .bak），返回 (记录数, 错误)。
+
+    一条记录都读不出来时不会覆盖目标文件。
+    """
+    errors: List[RecordError] = []
+    target = target or source
+    # 与运行中的应用共用数据文件的写锁，转换期间不会有其它进程写入
+    with JsonStorage(target).lock.hold():
+        fd, staging = create_temp(target)
+        os.close(fd)
+        try:
+            count = write_json_array(staging, migrate_records(source, errors))
+        except BaseException:
+            staging.unlink(missing_ok=True)
+            raise
+        if count == 0 and errors:
+            staging.unlink()
+            return count, errors
+        if target == source:
+            shutil.copy2(source, source.with_name(f"{source.name}.bak"))
+        os.replace(staging, target)
+    return count, errors
+
+
+def _write_indented(handle: TextIO, item: dict) -> None:
+    text = json.dumps(item, ensure_ascii=False, indent=2)
+    handle.write("  " + text.replace("\n", "\n  "))
+
+
+def _text(value: object) -> str:
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else str(value)
+
+
+def _integer(value: object) -> int:
+    try:
+        return int(float(value or 0))  # type: ignore[arg-type]
+    except (TypeError, ValueError):
+        return 0
+
+
+def _completion(value: object) -> int:
+    return min(max(_integer(value), 0), 100)
+
+
+def _file_links(value: object) -> List[FileLink]:
+    """旧版数据中附件可能是路径字符串列表，也可能缺少名称和扩展名"""
+    if not isinstance(value, list):
+        return []
+    links: List[FileLink] = []
+    for entry in value:
+        if isinstance(entry, str):
+            if entry:
+                links.append(FileLink.from_path(entry))
+        elif isinstance(entry, dict) and entry.get("path"):
+            path = _text(entry["path"])
+            is_folder = bool(entry.get("is_folder", False))
+            link = FileLink.from_path(path, is_folder=is_folder)
+            if entry.get("name"):
+                link.name = _text(entry["name"])
+            links.append(link)
+    return links
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="流式检查并转换 projects.json 到当前数据格式")
+    parser.add_argument("source", type=Path, help="源 JSON 文件，例如 data/projects.json")
+    parser.add_argument("target", type=Path, nargs="?", help="输出文件；省略时原地转换并保留 .bak 备份")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+    count, errors = migrate_json_file(args.source, args.target)
+    print(f"已转换 {count} 个项目到 {args.target or args.source}")
+    for error in errors:
+        print(error, file=sys.stderr)
+    if errors:
+        print(f"跳过了 {len(errors)} 处无法读取的内容", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,17 @@
 from __future__ import annotations
 
+import gc
+import sys
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Iterable, Iterator, List, Optional
 
 from .enums import STATUSES
 
 
-@dataclass
+@dataclass(slots=True)
 class FileLink:
     path: str
     name: str
@@ -16,10 +19,12 @@ class FileLink:
     is_folder: bool = False
 
     @classmethod
-    def from_path(cls, path: str) -> "FileLink":
+    def from_path(cls, path: str, is_folder: Optional[bool] = None) -> "FileLink":
+        """is_folder 未提供时 stat 一次路径；批量创建时可先用 check_paths 并行检查后传入"""
         file_path = Path(path)
         name = file_path.name if file_path.name else path
-        is_folder = file_path.is_dir() if file_path.exists() else False
+        if is_folder is None:
+            is_folder = file_path.is_dir()
         extension = "" if is_folder else file_path.suffix.lower()
         return cls(path=path, name=name, extension=extension, is_folder=is_folder)
 
@@ -56,12 +61,12 @@ class FileLink:
         return cls(
             path=data.get("path", ""),
             name=data.get("name", ""),
-            extension=data.get("extension", ""),
+            extension=sys.intern(data.get("extension", "")),
             is_folder=data.get("is_folder", False),
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Project:
     id: str
     name: str
@@ -75,13 +80,18 @@ class Project:
     files: List[FileLink] = field(default_factory=list)
     created_at: str = ""
     updated_at: str = ""
+    # 每次成功更新递增，用于检测并发修改
+    version: int = 0
 
-    def ensure_defaults(self) -> None:
+    def ensure_defaults(self, keep_timestamps: bool = False) -> None:
+        """补全状态和时间；keep_timestamps 为 True 时保留已有的 updated_at（批量导入沿用文件中的时间）"""
         if self.status not in STATUSES:
             self.status = STATUSES[0]
+        now = datetime.now().isoformat(timespec="seconds")
         if not self.created_at:
-            self.created_at = datetime.now().isoformat(timespec="seconds")
-        self.updated_at = datetime.now().isoformat(timespec="seconds")
+            self.created_at = now
+        if not keep_timestamps or not self.updated_at:
+            self.updated_at = now
 
     def to_dict(self) -> dict:
         return {
@@ -97,6 +107,7 @@ class Project:
             "files": [file.to_dict() for file in self.files],
             "created_at": self.created_at,
             "updated_at": self.updated_at,
+            "version": self.version,
         }
 
     @classmethod
@@ -107,12 +118,99 @@ class Project:
             name=data.get("name", ""),
             client=data.get("client", ""),
             opponent=data.get("opponent", ""),
-            lawyer=data.get("lawyer", ""),
-            stage=data.get("stage", ""),
+            lawyer=sys.intern(data.get("lawyer", "")),
+            stage=sys.intern(data.get("stage", "")),
             completion=int(data.get("completion", 0) or 0),
-            status=data.get("status", STATUSES[0]),
+            status=sys.intern(data.get("status", STATUSES[0])),
             notes=data.get("notes", ""),
             files=files,
             created_at=data.get("created_at", ""),
             updated_at=data.get("updated_at", ""),
+            version=int(data.get("version", 0) or 0),
         )
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """批量创建大量对象时暂停循环垃圾回收；这些对象之间没有循环引用，分代回收只会反复扫描新对象"""
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def decode_projects(items: Iterable[dict]) -> List[Project]:
+    """批量版 Project.from_dict：按位置构造并驻留状态、律师、阶段、扩展名等重复字符串"""
+    with paused_gc():
+        return _decode_projects(items)
+
+
+def _decode_projects(items: Iterable[dict]) -> List[Project]:
+    intern = sys.intern
+    new_project = Project
+    new_file = FileLink
+    default_status = STATUSES[0]
+    projects: List[Project] = []
+    append = projects.append
+    for data in items:
+        get = data.get
+        files = [
+            new_file(
+                file.get("path", ""),
+                file.get("name", ""),
+                intern(file.get("extension", "")),
+                file.get("is_folder", False),
+            )
+            for file in get("files") or ()
+        ]
+        append(
+            new_project(
+                get("id", ""),
+                get("name", ""),
+                get("client", ""),
+                get("opponent", ""),
+                intern(get("lawyer", "")),
+                intern(get("stage", "")),
+                int(get("completion", 0) or 0),
+                intern(get("status", default_status)),
+                get("notes", ""),
+                files,
+                get("created_at", ""),
+                get("updated_at", ""),
+                int(get("version", 0) or 0),
+            )
+        )
+    return projects
+
+
+def encode_projects(projects: Iterable[Project]) -> List[dict]:
+    """批量版 Project.to_dict，输出与逐个调用 to_dict 完全相同"""
+    with paused_gc():
+        return _encode_projects(projects)
+
+
+def _encode_projects(projects: Iterable[Project]) -> List[dict]:
+    return [
+        {
+            "id": project.id,
+            "name": project.name,
+            "client": project.client,
+            "opponent": project.opponent,
+            "lawyer": project.lawyer,
+            "stage": project.stage,
+            "completion": project.completion,
+            "status": project.status,
+            "notes": project.notes,
+            "files": [
+                {"path": file.path, "name": file.name, "extension": file.extension, "is_folder": file.is_folder}
+                for file in project.files
+            ],
+            "created_at": project.created_at,
+            "updated_at": project.updated_at,
+            "version": project.version,
+        }
+        for project in projects
+    ]
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from .watcher import IN_CLOSE_WRITE, IN_CREATE, IN_MODIFY, IN_MOVED_TO, _Inotify
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，单机单进程时无需加锁
+    fcntl = None  # type: ignore[assignment]
+
+DEFAULT_POLL_INTERVAL = 0.5
+# 有 inotify 时事件即时到达，仍按较长的间隔读取一次，防止事件丢失
+INOTIFY_FALLBACK_INTERVAL = 5.0
+STAMP_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_CREATE | IN_MOVED_TO
+_COUNTER_BYTES = 8
+
+
+class ChangeNotifier:
+    """同一台机器上共享数据目录的多个进程之间的变更通知。
+
+    写入数据的进程在版本戳文件（默认 data/.changes）中把计数器加一，读写都持有 fcntl 文件锁；
+    后台线程通过 inotify 监听该文件，不支持时每 poll_interval 秒读取一次 8 字节计数器。
+    version 只读内存中的值，调用方可以在每次重跑时比较而没有任何文件 I/O。
+    """
+
+    def __init__(self, path: Path, poll_interval: float = DEFAULT_POLL_INTERVAL, use_inotify: bool = True) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        self._inotify = _Inotify.create() if use_inotify else None
+        if self._inotify is not None and not self._inotify.watch(str(path.parent), STAMP_MASK):
+            self._inotify.close()
+            self._inotify = None
+        self._lock = threading.Lock()
+        self._version = self._read()
+        self._published = 0
+        self._received = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify is not None else "polling"
+
+    @property
+    def version(self) -> int:
+        """最近一次看到的计数器值；任何进程写入数据后都会变化"""
+        return self._version
+
+    def publish(self) -> int:
+        """数据写入存储后调用：计数器加一并返回新值"""
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            _lock(fd, exclusive=True)
+            version = _decode(os.pread(fd, _COUNTER_BYTES, 0)) + 1
+            os.pwrite(fd, version.to_bytes(_COUNTER_BYTES, "little"), 0)
+        finally:
+            # 关闭文件描述符即释放锁
+            os.close(fd)
+        with self._lock:
+            self._version = max(self._version, version)
+            self._published += 1
+        return version
+
+    def check(self) -> bool:
+        """读取计数器，返回是否有新的变更"""
+        version = self._read()
+        with self._lock:
+            if version == self._version:
+                return False
+            self._version = version
+            self._received += 1
+            return True
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "version": self._version,
+                "published": self._published,
+                "received": self._received,
+            }
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="change-notifier", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self._inotify is not None:
+                events = self._inotify.read(INOTIFY_FALLBACK_INTERVAL)
+                if events and not any(name == self.path.name for _, name, _ in events):
+                    continue
+            else:
+                self._stop.wait(self.poll_interval)
+            self.check()
+
+    def _read(self) -> int:
+        try:
+            fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return 0
+        try:
+            _lock(fd, exclusive=False)
+            return _decode(os.pread(fd, _COUNTER_BYTES, 0))
+        finally:
+            os.close(fd)
+
+
+def _lock(fd: int, exclusive: bool) -> None:
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+
+def _decode(data: bytes) -> int:
+    return int.from_bytes(data, "little") if len(data) == _COUNTER_BYTES else 0
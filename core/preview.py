@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import codecs
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from .extract import TEXT_EXTENSIONS
+
+PREVIEW_EXTENSIONS = TEXT_EXTENSIONS | {".ini", ".cfg", ".yaml", ".yml", ".tsv", ".rtf", ".eml"}
+PREVIEW_BYTES = 8 * 1024
+# 缓存中所有预览文本的总字符数上限
+DEFAULT_MAX_CHARS = 4 * 1024 * 1024
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+@dataclass(frozen=True)
+class Preview:
+    path: str
+    text: str
+    encoding: str
+    size: int
+    truncated: bool
+    binary: bool = False
+
+
+def can_preview(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in PREVIEW_EXTENSIONS
+
+
+def detect_encoding(data: bytes, truncated: bool) -> Tuple[str, str]:
+    """识别编码并解码，返回 (文本, 编码)；截断处可能落在多字节字符中间，按增量方式解码"""
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            return codecs.getincrementaldecoder(encoding)(errors="replace").decode(data, final=not truncated), encoding
+    for encoding in ("utf-8", "gb18030"):
+        try:
+            return codecs.getincrementaldecoder(encoding)().decode(data, final=not truncated), encoding
+        except UnicodeDecodeError:
+            continue
+    return data.decode("utf-8", errors="replace"), "unknown"
+
+
+def read_preview(path: str, limit: int = PREVIEW_BYTES) -> Preview:
+    """通过 mmap 只映射文件开头 limit 字节，文件再大也不会整体读入"""
+    with open(path, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        length = min(size, limit)
+        if length == 0:
+            return Preview(path=path, text="", encoding="utf-8", size=size, truncated=False)
+        with mmap.mmap(handle.fileno(), length, access=mmap.ACCESS_READ) as mapped:
+            data = mapped[:length]
+    truncated = size > length
+    if b"\x00" in data and not data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return Preview(path=path, text="", encoding="", size=size, truncated=truncated, binary=True)
+    text, encoding = detect_encoding(data, truncated)
+    return Preview(path=path, text=text, encoding=encoding, size=size, truncated=truncated)
+
+
+class PreviewCache:
+    """按总字符数限制大小的 LRU 预览缓存，键为 (路径, mtime_ns, 大小)，文件修改后自动失效"""
+
+    def __init__(self, max_chars: int = DEFAULT_MAX_CHARS, limit: int = PREVIEW_BYTES) -> None:
+        self.max_chars = max_chars
+        self.limit = limit
+        self._entries: "OrderedDict[Tuple[str, int, int], Preview]" = OrderedDict()
+        self._chars = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, path: str) -> Optional[Preview]:
+        """返回预览；路径不存在或无法读取时返回 None"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            preview = self._entries.get(key)
+            if preview is not None:
+                self._entries.move_to_end(key)
+                return preview
+        try:
+            preview = read_preview(path, self.limit)
+        except (OSError, ValueError):
+            return None
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = preview
+                self._chars += len(preview.text)
+            while self._chars > self.max_chars and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._chars -= len(evicted.text)
+        return preview
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._chars = 0
+
+
+# 进程内共享的预览缓存
+preview_cache = PreviewCache()
@@ -1,62 +1,612 @@
 from __future__ import annotations
 
+import functools
+import threading
+import time
+from itertools import islice
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Callable, Dict, Iterable, List, NoReturn, Optional, Set, Tuple, TypeVar, cast
 
-from .models import Project
-from .storage import JsonStorage
+from .conflicts import PartyIndex
+from .index import Index, ProjectIndex, sort_key
+from .json_stream import RecordError
+from .models import Project, decode_projects, encode_projects, paused_gc
+from .notify import ChangeNotifier
+from .search import SearchIndex
+from .storage import JsonStorage, Signature, Storage, WriteConflict
+from .write_behind import DEFAULT_DELAY, WriteBehindQueue
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _synchronized(method: F) -> F:
+    """多个 Streamlit 会话共享同一个仓库实例，公开方法串行执行"""
+
+    @functools.wraps(method)
+    def wrapper(self: "ProjectRepository", *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return cast(F, wrapper)
+
+
+def _exclusive(method: F) -> F:
+    """写入方法在“刷新 → 比较版本 → 写入”期间持有存储的跨进程写锁（存储提供 write_lock() 时），
+    多个进程共享数据目录时比较并交换才成立"""
+
+    @functools.wraps(method)
+    def wrapper(self: "ProjectRepository", *args: Any, **kwargs: Any) -> Any:
+        write_lock = getattr(self.storage, "write_lock", None)
+        if write_lock is None:
+            return method(self, *args, **kwargs)
+        with write_lock():
+            return method(self, *args, **kwargs)
+
+    return cast(F, wrapper)
+
+
+# 后台补全分片项目的 notes/files 时每批读取的分片数
+HYDRATE_BATCH_SIZE = 200
+# 使用变更通知时，未收到通知也每隔该秒数检查一次存储签名，覆盖手工编辑、迁移脚本等不发通知的修改
+SIGNATURE_CHECK_INTERVAL = 5.0
+
+ORDER_FIELDS = ["relevance", "updated_at", "created_at", "name", "client", "lawyer", "completion"]
+
+
+class VersionConflict(Exception):
+    """保存或删除时项目已被其它会话修改；current 为当前最新的项目，已被删除时为 None"""
+
+    def __init__(self, project_id: str, expected: int, current: Optional[Project]) -> None:
+        super().__init__(f"项目 {project_id} 已被修改（期望版本 {expected}，当前版本 {current.version if current else '已删除'}）")
+        self.project_id = project_id
+        self.expected = expected
+        self.current = current
 
 
 class ProjectRepository:
-    def __init__(self, data_file: Path) -> None:
-        self.storage = JsonStorage(data_file)
+    def __init__(
+        self,
+        data_file: Path,
+        storage: Optional[Storage] = None,
+        write_behind: bool = False,
+        flush_delay: float = DEFAULT_DELAY,
+        notifier: Optional[ChangeNotifier] = None,
+    ) -> None:
+        self.storage = storage or JsonStorage(data_file)
+        # 内存缓存：按 id 索引，仅在数据文件变化时重新加载
+        self._projects: Dict[str, Project] = {}
+        self._index = ProjectIndex()
+        self._search = SearchIndex()
+        self._parties = PartyIndex()
+        self._indexes: Tuple[Index, ...] = (self._index, self._search, self._parties)
+        self._signature: Optional[Signature] = None
+        self._loaded = False
+        # 只从清单加载了看板字段、notes/files 尚未读取的项目
+        self._partial: Set[str] = set()
+        self._needs_full = False
+        self._hydrator: Optional[threading.Thread] = None
+        self._lock = threading.RLock()
+        # 数据版本号：重新加载或写入时递增，派生视图据此判断缓存是否失效
+        self._version = 0
+        # 多进程共享数据目录时，写入后发布通知；没有新通知时跳过存储签名检查
+        self._notifier = notifier
+        self._seen_change = -1
+        self._checked_at = 0.0
+        # 后台写入模式下写入只进入队列；队列写完之前内存中的数据比存储新，不从存储重新加载
+        self._writer: Optional[WriteBehindQueue] = None
+        # 不支持单条写入的后端每次都整体重写：记下尚未落盘的修改（项目编号 → 修改时的数据版本号），
+        # 写入前存储若已被其它进程修改，以存储为准再叠加这些修改，不覆盖对方的写入
+        self._unflushed: Dict[str, int] = {}
+        self._cleared_at: Optional[int] = None
+        self._snapshot_marks: Tuple[Dict[str, int], Optional[int]] = ({}, None)
+        if write_behind:
+            self._writer = WriteBehindQueue(self.storage, self._snapshot, self._flushed, delay=flush_delay)
+            self._writer.start()
 
+    @_synchronized
     def list(self) -> List[Project]:
-        data = self.storage.load()
-        projects = [Project.from_dict(item) for item in data]
-        projects.sort(key=lambda item: item.updated_at or item.created_at, reverse=True)
-        return projects
+        """按更新时间倒序的全部项目；分片存储下 notes/files 可能尚未加载，需要完整数据时用 get()"""
+        self._refresh()
+        return self._ordered()
 
+    @_synchronized
+    def list_full(self) -> List[Project]:
+        """同 list()，但先补全分片存储下尚未加载的项目，用于导出等需要完整数据的场合"""
+        self._refresh()
+        self._hydrate(list(self._partial))
+        return self._ordered()
+
+    @_synchronized
+    def data_version(self) -> int:
+        self._refresh()
+        return self._version
+
+    @_synchronized
+    def load_errors(self) -> List[RecordError]:
+        """最近一次加载数据文件时因损坏而跳过的记录"""
+        self._refresh()
+        return list(getattr(self.storage, "load_errors", ()))
+
+    @_synchronized
     def get(self, project_id: str) -> Optional[Project]:
-        for project in self.list():
-            if project.id == project_id:
-                return project
-        return None
+        fetch = getattr(self.storage, "get", None)
+        if fetch is not None and not self._is_current():
+            # 缓存尚未加载或已过期时，支持按 id 读取的后端直接读取单条记录，不触发整体加载
+            item = fetch(project_id)
+            return Project.from_dict(item) if item is not None else None
+        self._refresh()
+        if project_id in self._partial:
+            self._hydrate([project_id])
+        return self._projects.get(project_id)
+
+    @_synchronized
+    def get_many(self, project_ids: Iterable[str]) -> Dict[str, Project]:
+        """批量按编号读取，只检查一次缓存；不存在的编号不出现在结果中"""
+        self._refresh()
+        found = [project_id for project_id in project_ids if project_id in self._projects]
+        self._hydrate(found)
+        return {project_id: self._projects[project_id] for project_id in found}
+
+    @_synchronized
+    def count(self, status: Optional[str] = None) -> int:
+        """项目数量，可按状态统计，直接读取索引"""
+        self._refresh()
+        return self._index.count(status)
+
+    @_synchronized
+    def query(
+        self,
+        status: Optional[str] = None,
+        lawyer: Optional[str] = None,
+        client: Optional[str] = None,
+        keyword: Optional[str] = None,
+        order_by: str = "-updated_at",
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[Project]:
+        """按条件查询项目。
+
+        status/lawyer 走哈希索引，client 为精确匹配，keyword 通过全文索引检索
+        名称、当事人、相对人、承办律师、阶段、备注和附件名。order_by 为 ORDER_FIELDS 中的字段，
+        前缀 "-" 表示倒序；"relevance" 按关键词相关度排序，没有关键词时等同于 "-updated_at"。
+        没有关键词且存储后端支持查询时整体下推执行。
+        """
+        field = order_by.lstrip("-")
+        if field not in ORDER_FIELDS:
+            raise ValueError(f"不支持的排序字段：{order_by}")
+        descending = order_by.startswith("-")
+        self._refresh()
+        needle = (keyword or "").strip()
+        if field == "relevance" and not needle:
+            field, order_by, descending = "updated_at", "-updated_at", True
+        if needle:
+            # 关键词会匹配备注和附件名，先补全尚未加载的项目
+            self._hydrate(list(self._partial))
+        storage_query = getattr(self.storage, "query", None)
+        # 后台写入队列未清空时存储落后于内存，不能下推
+        pending = self._writer is not None and self._writer.depth() > 0
+        if storage_query is not None and not needle and not pending:
+            ids = storage_query(
+                status=status,
+                lawyer=lawyer,
+                client=client,
+                order_by=order_by,
+                limit=limit,
+                offset=offset,
+            )
+            return [self._projects[item] for item in ids if item in self._projects]
+
+        candidates = self._index.candidates(status=status, lawyer=lawyer)
+        if needle:
+            result = [
+                self._projects[project_id]
+                for project_id, _ in self._search.search(needle)
+                if candidates is None or project_id in candidates
+            ]
+            if client is not None:
+                result = [project for project in result if project.client == client]
+            if field == "updated_at":
+                result.sort(key=sort_key, reverse=descending)
+            elif field != "relevance":
+                result.sort(key=lambda item: getattr(item, field), reverse=descending)
+            return self._page(result, limit, offset)
+
+        if field != "updated_at":
+            pool = self._projects.values() if candidates is None else (self._projects[item] for item in candidates)
+            result = [project for project in pool if client is None or project.client == client]
+            result.sort(key=lambda item: getattr(item, field), reverse=descending)
+            return self._page(result, limit, offset)
+
+        if candidates is not None and (limit is None or len(candidates) * 8 < len(self._index)):
+            # 候选集较小时直接排序候选集，避免遍历整个有序表
+            ordered: Iterable[str] = self._index.sorted_ids(candidates, newest_first=descending)
+            candidates = None
+        else:
+            ordered = self._index.newest_first() if descending else self._index.oldest_first()
+
+        result: List[Project] = []
+        skipped = 0
+        for project_id in ordered:
+            if candidates is not None and project_id not in candidates:
+                continue
+            project = self._projects[project_id]
+            if client is not None and project.client != client:
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            result.append(project)
+            if limit is not None and len(result) >= limit:
+                break
+        return result
+
+    @_synchronized
+    def find_parties(self, name: str) -> List[Tuple[Project, Set[str]]]:
+        """按规范化名称查找以当事人或相对人身份出现过的项目及角色"""
+        self._refresh()
+        return [
+            (self._projects[project_id], roles)
+            for project_id, roles in self._parties.lookup(name).items()
+            if project_id in self._projects
+        ]
+
+    @_synchronized
+    def attach(self, index: Index) -> None:
+        """注册额外的索引，之后随加载和写入同步维护"""
+        self._refresh()
+        index.rebuild(self._projects.values())
+        self._indexes = self._indexes + (index,)
+        # 附加索引通常需要附件列表，分片项目在后台补全后再逐个通知索引
+        self._needs_full = True
+        if self._partial:
+            self._start_hydration()
 
+    @_synchronized
+    @_exclusive
     def add(self, project: Project) -> None:
         project.ensure_defaults()
-        projects = self.list()
-        projects.insert(0, project)
-        self._save(projects)
+        self._refresh(verify=True)
+        self._put(project)
+        self._save(project)
 
+    @_synchronized
+    @_exclusive
     def update(self, project: Project) -> None:
+        """比较并交换：project.version 须等于当前版本，否则抛出 VersionConflict；成功后版本号加一。
+
+        只比较同一个项目的版本，不同项目的修改互不影响。
+        """
+        self._refresh(verify=True)
+        self._check_version(project.id, project.version)
         project.ensure_defaults()
-        projects = self.list()
-        updated = False
-        for index, existing in enumerate(projects):
-            if existing.id == project.id:
-                projects[index] = project
-                updated = True
-                break
-        if not updated:
-            projects.insert(0, project)
-        self._save(projects)
-
-    def delete(self, project_id: str) -> bool:
-        projects = self.list()
-        filtered = [project for project in projects if project.id != project_id]
-        if len(filtered) == len(projects):
+        project.version += 1
+        self._put(project)
+        try:
+            self._save(project)
+        except VersionConflict:
+            project.version -= 1
+            raise
+
+    @_synchronized
+    @_exclusive
+    def add_many(self, projects: Iterable[Project], keep_timestamps: bool = False) -> int:
+        """批量新增并只写入一次存储，返回新增数量；编号与已有项目或批次内重复时抛出 ValueError，不做任何修改。
+
+        keep_timestamps 为 True 时保留项目已有的 created_at/updated_at，只补全空缺的时间。
+        """
+        batch = list(projects)
+        if not batch:
+            return 0
+        self._refresh(verify=True)
+        seen: Set[str] = set()
+        for project in batch:
+            if project.id in self._projects or project.id in seen:
+                raise ValueError(f"项目编号已存在：{project.id}")
+            seen.add(project.id)
+        for project in batch:
+            project.ensure_defaults(keep_timestamps)
+        self._put_many(batch)
+        self._save_many(batch)
+        return len(batch)
+
+    @_synchronized
+    @_exclusive
+    def update_many(self, projects: Iterable[Project], keep_timestamps: bool = False) -> int:
+        """批量比较并交换，只写入一次存储，返回更新数量；任一项目版本不符时抛出 VersionConflict，不做任何修改。
+
+        keep_timestamps 与 add_many 相同。
+        """
+        batch = list(projects)
+        if not batch:
+            return 0
+        self._refresh(verify=True)
+        for project in batch:
+            self._check_version(project.id, project.version)
+        if len({project.id for project in batch}) != len(batch):
+            raise ValueError("同一批次中包含重复的项目编号")
+        for project in batch:
+            project.ensure_defaults(keep_timestamps)
+            project.version += 1
+        self._put_many(batch)
+        try:
+            self._save_many(batch)
+        except VersionConflict:
+            for project in batch:
+                project.version -= 1
+            raise
+        return len(batch)
+
+    @_synchronized
+    @_exclusive
+    def delete(self, project_id: str, expected_version: Optional[int] = None) -> bool:
+        """expected_version 不为 None 时，项目在此期间被修改过则抛出 VersionConflict"""
+        self._refresh(verify=True)
+        if project_id not in self._projects:
             return False
-        self._save(filtered)
+        if expected_version is not None:
+            self._check_version(project_id, expected_version)
+        del self._projects[project_id]
+        self._partial.discard(project_id)
+        self._version += 1
+        for index in self._indexes:
+            index.remove(project_id)
+        if self.storage.incremental and self._writer is not None:
+            self._writer.remove(project_id)
+        elif self.storage.incremental:
+            before = self.storage.signature()
+            remove_checked = getattr(self.storage, "remove_checked", None)
+            if expected_version is not None and remove_checked is not None:
+                try:
+                    remove_checked(project_id, expected_version)
+                except WriteConflict:
+                    self._stored_conflict(project_id, expected_version)
+            else:
+                self.storage.remove(project_id)
+            self._mark_stored(before)
+        else:
+            self._unflushed[project_id] = self._version
+            self._save()
         return True
 
+    @_synchronized
+    @_exclusive
     def delete_all(self) -> int:
         """删除所有项目，返回删除的数量"""
-        projects = self.list()
-        count = len(projects)
-        self._save([])
+        self._refresh(verify=True)
+        count = len(self._projects)
+        self._version += 1
+        self._projects.clear()
+        self._partial.clear()
+        for index in self._indexes:
+            index.rebuild([])
+        self._unflushed.clear()
+        self._cleared_at = self._version
+        self._save()
         return count
 
-    def _save(self, projects: List[Project]) -> None:
-        data = [project.to_dict() for project in projects]
-        self.storage.save(data)
+    def flush(self) -> None:
+        """后台写入模式下立即写入队列中的修改；不能在持有仓库锁时调用"""
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self) -> None:
+        """停止后台写入线程，返回前队列已全部落盘"""
+        if self._writer is not None:
+            self._writer.stop()
+
+    def write_stats(self) -> Optional[Dict[str, object]]:
+        """后台写入队列的深度和写入耗时，未启用后台写入时为 None"""
+        return self._writer.stats() if self._writer is not None else None
+
+    def _ordered(self) -> List[Project]:
+        return [self._projects[project_id] for project_id in self._index.newest_first()]
+
+    def _put_many(self, projects: List[Project]) -> None:
+        """批量放入内存；批次较大时整体重建索引，比逐个插入有序表快"""
+        if len(projects) * 8 < len(self._projects):
+            for project in projects:
+                self._put(project)
+            return
+        self._version += 1
+        for project in projects:
+            self._projects[project.id] = project
+            self._partial.discard(project.id)
+        with paused_gc():
+            for index in self._indexes:
+                index.rebuild(self._projects.values())
+
+    def _put(self, project: Project) -> None:
+        self._version += 1
+        self._projects[project.id] = project
+        self._partial.discard(project.id)
+        for index in self._indexes:
+            index.add(project)
+
+    def _refresh(self, verify: bool = False) -> None:
+        """数据文件的 mtime/size/inode 未变化时直接使用缓存"""
+        if self._is_current(verify):
+            return
+        signature = self.storage.signature()
+        projects: Dict[str, Project] = {}
+        # 分片存储只读取看板字段的清单；能直接给出模型的后端（例如带二进制快照的 JSON 存储）跳过字典这一层
+        load_summaries = getattr(self.storage, "load_summaries", None)
+        loaded = decode_projects(load_summaries()) if load_summaries is not None else self._load_full()
+        for project in loaded:
+            projects.setdefault(project.id, project)
+        self._projects = projects
+        self._partial = set(projects) if load_summaries is not None else set()
+        with paused_gc():
+            for index in self._indexes:
+                index.rebuild(projects.values())
+        self._signature = signature
+        self._loaded = True
+        self._version += 1
+        if self._partial and self._needs_full:
+            self._start_hydration()
+
+    def _load_full(self) -> List[Project]:
+        load_projects = getattr(self.storage, "load_projects", None)
+        return load_projects() if load_projects is not None else decode_projects(self.storage.load())
+
+    def _check_version(self, project_id: str, expected: int) -> None:
+        current = self._projects.get(project_id)
+        if current is not None and current.version == expected:
+            return
+        if current is not None and project_id in self._partial:
+            self._hydrate([project_id])
+            current = self._projects[project_id]
+        raise VersionConflict(project_id, expected, current)
+
+    def _is_current(self, verify: bool = False) -> bool:
+        """verify 为 True 时总是比较存储签名（写入前的版本比较不能依赖通知）"""
+        if not self._loaded:
+            return False
+        if self._writer is not None and self._writer.depth():
+            return True
+        if self._notifier is None or verify:
+            return self.storage.signature() == self._signature
+        # 先记下通知计数再检查签名，检查期间到达的通知会在下次调用时处理
+        change = self._notifier.version
+        now = time.monotonic()
+        if change == self._seen_change and now - self._checked_at < SIGNATURE_CHECK_INTERVAL:
+            return True
+        self._seen_change, self._checked_at = change, now
+        return self.storage.signature() == self._signature
+
+    def _hydrate(self, project_ids: List[str]) -> None:
+        """读取分片补全项目的 notes/files，并通知各索引"""
+        with self._lock:
+            pending = [project_id for project_id in project_ids if project_id in self._partial]
+            versions = {project_id: self._projects[project_id].version for project_id in pending}
+        # 读取分片时不持有锁（同步调用时锁是可重入的，仍由调用方持有）
+        items = [self.storage.get(project_id) for project_id in pending]
+        with self._lock, paused_gc():
+            for project_id, item in zip(pending, items):
+                # 读取期间项目被修改、删除或整体重新加载过的，以内存中的状态为准
+                if project_id not in self._partial or self._projects[project_id].version != versions[project_id]:
+                    continue
+                self._partial.discard(project_id)
+                if item is None:
+                    continue
+                project = Project.from_dict(item)
+                self._projects[project_id] = project
+                for index in self._indexes:
+                    index.add(project)
+
+    def _start_hydration(self) -> None:
+        if self._hydrator is not None and self._hydrator.is_alive():
+            return
+        self._hydrator = threading.Thread(target=self._hydrate_remaining, name="project-hydrator", daemon=True)
+        self._hydrator.start()
+
+    def _hydrate_remaining(self) -> None:
+        while True:
+            with self._lock:
+                batch = list(islice(self._partial, HYDRATE_BATCH_SIZE))
+            if not batch:
+                return
+            self._hydrate(batch)
+
+    @staticmethod
+    def _page(projects: List[Project], limit: Optional[int], offset: int) -> List[Project]:
+        if limit is None:
+            return projects[offset:]
+        return projects[offset : offset + limit]
+
+    def _save(self, changed: Optional[Project] = None) -> None:
+        self._save_many(None if changed is None else [changed])
+
+    def _save_many(self, changed: Optional[List[Project]] = None) -> None:
+        """支持单条写入的存储只写入变更的项目（有 upsert_many 时一次写入），否则重写全部数据；
+        后台写入模式下只放入队列"""
+        if self._writer is not None:
+            if changed is not None and self.storage.incremental:
+                for project in changed:
+                    self._writer.put(project.to_dict())
+            else:
+                for project in changed or ():
+                    self._unflushed[project.id] = self._version
+                self._writer.replace_all()
+            return
+        before = self.storage.signature()
+        if changed is not None and self.storage.incremental:
+            items = encode_projects(changed)
+            upsert_checked = getattr(self.storage, "upsert_checked", None)
+            upsert_many = getattr(self.storage, "upsert_many", None)
+            if upsert_checked is not None:
+                try:
+                    upsert_checked(items)
+                except WriteConflict as exc:
+                    project = next(project for project in changed if project.id == exc.project_id)
+                    self._stored_conflict(exc.project_id, max(project.version - 1, 0))
+            elif upsert_many is not None:
+                upsert_many(items)
+            else:
+                for item in items:
+                    self.storage.upsert(item)
+        else:
+            for project in changed or ():
+                self._unflushed[project.id] = self._version
+            if before != self._signature:
+                # 刷新之后存储又被其它进程修改过：先合并对方的写入，再整体重写。
+                # 写入方法持有存储的写锁（见 _exclusive）时不会发生，没有 fcntl 的平台上仍靠这里合并
+                self._merge_stored()
+                before = self._signature
+            self.storage.save(self._snapshot())
+            self._unflushed.clear()
+            self._cleared_at = None
+        self._mark_stored(before)
+
+    def _stored_conflict(self, project_id: str, expected: int) -> NoReturn:
+        """存储在写入时比较版本号发现冲突：本次修改没有写入，丢弃内存中的修改重新加载后抛出 VersionConflict"""
+        self._signature = None
+        self._refresh()
+        raise VersionConflict(project_id, expected, self._projects.get(project_id))
+
+    @_synchronized
+    def _snapshot(self) -> List[dict]:
+        # 整体重写前必须补全，否则尚未加载的 notes/files 会被清空
+        self._hydrate(list(self._partial))
+        if self._writer is not None and not self.storage.incremental:
+            self._merge_stored()
+            self._snapshot_marks = (dict(self._unflushed), self._cleared_at)
+        return encode_projects(self._ordered())
+
+    def _merge_stored(self) -> None:
+        """上次读取或写入之后存储被其它进程修改过时，以存储中的数据为准，叠加本进程尚未落盘的修改"""
+        signature = self.storage.signature()
+        if signature == self._signature:
+            return
+        projects = {} if self._cleared_at is not None else {project.id: project for project in self._load_full()}
+        for project_id in self._unflushed:
+            if project_id in self._projects:
+                projects[project_id] = self._projects[project_id]
+            else:
+                projects.pop(project_id, None)
+        self._projects = projects
+        self._partial = set()
+        with paused_gc():
+            for index in self._indexes:
+                index.rebuild(projects.values())
+        self._signature = signature
+        self._version += 1
+
+    @_synchronized
+    def _flushed(self, before: Optional[Signature]) -> None:
+        # 只清除已写入的修改；写入期间再次修改的项目版本号已变化，留到下次写入
+        marks, cleared_at = self._snapshot_marks
+        for project_id, version in marks.items():
+            if self._unflushed.get(project_id) == version:
+                del self._unflushed[project_id]
+        if cleared_at is not None and self._cleared_at == cleared_at:
+            self._cleared_at = None
+        self._snapshot_marks = ({}, None)
+        self._mark_stored(before)
+
+    def _mark_stored(self, before: Optional[Signature]) -> None:
+        """写入后记下存储签名；before 为写入前的签名。
+        写入前存储已被其它进程修改过时，内存中没有对方的写入，不能采用写入后的签名，
+        清空签名使下次读取时重新加载"""
+        self._signature = self.storage.signature() if before == self._signature else None
+        if self._notifier is not None:
+            self._notifier.publish()
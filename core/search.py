@@ -0,0 +1,312 @@
+from __future__ import annotations
+
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from operator import add, itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import Project, paused_gc
+
+# 字段权重：命中项目名称/当事人比命中备注更相关
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "client": 2.0,
+    "opponent": 2.0,
+    "lawyer": 1.5,
+    "stage": 1.0,
+    "files": 1.0,
+    "notes": 0.5,
+}
+
+Term = Tuple[str, bool]
+Hit = Tuple[str, float]
+
+# 缓存最近的查询结果和高频词项的得分表，任何写入都会清空
+RESULT_CACHE_SIZE = 32
+TERM_CACHE_SIZE = 64
+# 命中文档数达到该值的词项（如“公司”“律师”）才缓存得分表，低频词项现算更快
+TERM_CACHE_MIN_DOCS = 1000
+
+
+# 汉字、假名、韩文等不以空格分词的文字按字切分，其余字母和数字按词切分
+_IDEOGRAPHS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\U00020000-\U0002fa1f"
+_RUN_PATTERN = re.compile(f"([{_IDEOGRAPHS}]+)|([^\\W_{_IDEOGRAPHS}]+)")
+
+
+def _runs(text: str) -> Iterable[Tuple[str, bool]]:
+    """把文本切分为连续的 (片段, 是否为表意文字) 序列，标点和空白作为分隔"""
+    normalized = unicodedata.normalize("NFKC", text).casefold()
+    for match in _RUN_PATTERN.finditer(normalized):
+        ideographs, word = match.groups()
+        yield (ideographs, True) if ideographs else (word, False)
+
+
+def tokenize(text: str) -> List[str]:
+    """索引分词：表意文字切为二元组并附加末字单字，字母和数字保留整词"""
+    tokens: List[str] = []
+    for run, ideograph in _runs(text):
+        if not ideograph:
+            tokens.append(run)
+            continue
+        tokens.extend(run[index : index + 2] for index in range(len(run) - 1))
+        tokens.append(run[-1])
+    return tokens
+
+
+def query_terms(text: str) -> List[Term]:
+    """查询分词，返回 (词项, 是否前缀匹配)。
+
+    单个汉字按前缀匹配二元组（配合末字单字即可覆盖任意位置），
+    多个汉字拆为二元组精确匹配，字母和数字按词前缀匹配。
+    """
+    terms: List[Term] = []
+    for run, ideograph in _runs(text):
+        if not ideograph or len(run) == 1:
+            terms.append((run, True))
+            continue
+        terms.extend((run[index : index + 2], False) for index in range(len(run) - 1))
+    return terms
+
+
+def _project_texts(project: Project) -> List[Tuple[str, float]]:
+    fields = {
+        "name": project.name,
+        "client": project.client,
+        "opponent": project.opponent,
+        "lawyer": project.lawyer,
+        "stage": project.stage,
+        "files": " ".join(file.name for file in project.files),
+        "notes": project.notes,
+    }
+    return [(text, FIELD_WEIGHTS[field]) for field, text in fields.items() if text]
+
+
+class TextIndex:
+    """通用倒排索引：文档由若干 (文本, 权重) 组成，按 权重×idf 打分"""
+
+    def __init__(self) -> None:
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._vocabulary: List[str] = []
+        self._documents: Dict[str, Dict[str, float]] = {}
+        self._results: "OrderedDict[str, List[Hit]]" = OrderedDict()
+        self._term_scores: "OrderedDict[Term, Dict[str, float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def put(self, doc_id: str, texts: Iterable[Tuple[str, float]]) -> None:
+        self.discard(doc_id)
+        self._invalidate()
+        for token in self._write(doc_id, texts):
+            insort(self._vocabulary, token)
+
+    def discard(self, doc_id: str) -> None:
+        weights = self._documents.pop(doc_id, None)
+        if not weights:
+            return
+        self._invalidate()
+        for token in weights:
+            postings = self._postings.get(token)
+            if postings is None:
+                continue
+            postings.pop(doc_id, None)
+            if not postings:
+                del self._postings[token]
+                position = bisect_left(self._vocabulary, token)
+                if position < len(self._vocabulary) and self._vocabulary[position] == token:
+                    del self._vocabulary[position]
+
+    def search(self, text: str) -> List[Hit]:
+        """返回 (文档 id, 相关度)，按相关度降序；所有词项都需命中"""
+        cached = self._results.get(text)
+        if cached is None:
+            cached = self._search(text)
+            self._results[text] = cached
+            if len(self._results) > RESULT_CACHE_SIZE:
+                self._results.popitem(last=False)
+        else:
+            self._results.move_to_end(text)
+        return list(cached)
+
+    def _search(self, text: str) -> List[Hit]:
+        terms = set(query_terms(text))
+        if not terms:
+            return []
+        tables: List[Tuple[Dict[str, float], float]] = []
+        for term in terms:
+            table, idf = self._scores(term)
+            if not table:
+                return []
+            tables.append((table, idf))
+        # 从命中文档最少的词项开始求交集，候选集只会越来越小；交集和取值都在 C 层完成
+        tables.sort(key=lambda entry: len(entry[0]))
+        total = len(self._documents)
+        if len(tables) == 1:
+            table, idf = tables[0]
+            ordered = list(table)
+        else:
+            candidates = tables[0][0].keys() & tables[1][0].keys()
+            for table, _ in tables[2:]:
+                if not candidates:
+                    break
+                # 覆盖全部文档的词项不会缩小候选集，跳过求交
+                if len(table) < total:
+                    candidates &= table.keys()
+            if not candidates:
+                return []
+            ordered = list(candidates)
+        # 按列累加（map(add, ...)），避免为每个文档构造元组再 sum
+        totals: Iterable[float] = ()
+        for index, (table, idf) in enumerate(tables):
+            column = map(table.__getitem__, ordered)
+            if idf != 1.0:
+                column = map(idf.__mul__, column)
+            totals = column if index == 0 else map(add, totals, column)
+        hits = list(zip(ordered, totals))
+        hits.sort(key=itemgetter(1), reverse=True)
+        return hits
+
+    def _scores(self, term: Term) -> Tuple[Dict[str, float], float]:
+        """返回词项的 (文档 → 权重 表, idf 系数)。
+
+        只展开为一个词的词项直接使用倒排表，不复制；前缀词项展开为多个词时合并为
+        文档 → 权重×idf 表（系数为 1），命中文档多的合并结果会缓存。
+        """
+        tokens = self._expand(*term)
+        if not tokens:
+            return {}, 1.0
+        total = len(self._documents) or 1
+        if len(tokens) == 1:
+            postings = self._postings[tokens[0]]
+            return postings, math.log(1 + total / len(postings))
+        cached = self._term_scores.get(term)
+        if cached is not None:
+            self._term_scores.move_to_end(term)
+            return cached, 1.0
+        table: Dict[str, float] = {}
+        for token in tokens:
+            postings = self._postings[token]
+            idf = math.log(1 + total / len(postings))
+            if not table:
+                table = {doc_id: weight * idf for doc_id, weight in postings.items()}
+                continue
+            for doc_id, weight in postings.items():
+                table[doc_id] = table.get(doc_id, 0.0) + weight * idf
+        if len(table) >= TERM_CACHE_MIN_DOCS:
+            self._term_scores[term] = table
+            if len(self._term_scores) > TERM_CACHE_SIZE:
+                self._term_scores.popitem(last=False)
+        return table, 1.0
+
+    def _invalidate(self) -> None:
+        if self._results or self._term_scores:
+            self._results.clear()
+            self._term_scores.clear()
+
+    def _clear(self) -> None:
+        self._postings = {}
+        self._vocabulary = []
+        self._documents = {}
+        self._invalidate()
+
+    def _write(self, doc_id: str, texts: Iterable[Tuple[str, float]]) -> List[str]:
+        """写入倒排表，返回新出现的词项（由调用方维护有序词表）"""
+        weights: Dict[str, float] = {}
+        for text, weight in texts:
+            for token in tokenize(text):
+                weights[token] = weights.get(token, 0.0) + weight
+        self._documents[doc_id] = weights
+        new_tokens = []
+        for token, weight in weights.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = {}
+                new_tokens.append(token)
+            postings[doc_id] = weight
+        return new_tokens
+
+    def _expand(self, term: str, prefix: bool) -> List[str]:
+        if not prefix:
+            return [term] if term in self._postings else []
+        start = bisect_left(self._vocabulary, term)
+        end = bisect_left(self._vocabulary, term + "\U0010ffff", start)
+        return self._vocabulary[start:end]
+
+
+class SearchIndex(TextIndex):
+    """项目的倒排索引，覆盖名称、当事人、相对人、承办律师、阶段、备注和附件名。
+
+    写入时增量维护；重新加载后在后台线程中整体构建（不占用仓库锁），
+    构建期间的写入先记下，构建完成后再补上。构建完成前的搜索等待构建结束。
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._lock = threading.Lock()
+        self._generation = 0
+        # 后台构建期间的修改：项目编号 → 项目，None 表示已删除；没有在构建时为 None
+        self._changes: Optional[Dict[str, Optional[Project]]] = None
+        self._builder: Optional[threading.Thread] = None
+
+    def rebuild(self, projects: Iterable[Project]) -> None:
+        snapshot = list(projects)
+        with self._lock:
+            self._clear()
+            self._generation += 1
+            self._changes = {}
+            builder = threading.Thread(
+                target=self._build,
+                args=(self._generation, snapshot),
+                name="search-index-builder",
+                daemon=True,
+            )
+            self._builder = builder
+        builder.start()
+
+    def add(self, project: Project) -> None:
+        with self._lock:
+            if self._changes is not None:
+                self._changes[project.id] = project
+                return
+            self.put(project.id, _project_texts(project))
+
+    def remove(self, project_id: str) -> None:
+        with self._lock:
+            if self._changes is not None:
+                self._changes[project_id] = None
+                return
+            self.discard(project_id)
+
+    def wait(self) -> None:
+        """等待后台构建完成"""
+        builder = self._builder
+        if builder is not None:
+            builder.join()
+
+    def search(self, text: str) -> List[Hit]:
+        self.wait()
+        with self._lock:
+            return super().search(text)
+
+    def _build(self, generation: int, projects: List[Project]) -> None:
+        built = TextIndex()
+        with paused_gc():
+            for project in projects:
+                built._write(project.id, _project_texts(project))
+        built._vocabulary = sorted(built._postings)
+        with self._lock:
+            if generation != self._generation:
+                # 构建期间又重新加载过，结果已过时
+                return
+            self._postings, self._vocabulary, self._documents = built._postings, built._vocabulary, built._documents
+            self._invalidate()
+            changes, self._changes = self._changes or {}, None
+            for project_id, project in changes.items():
+                if project is None:
+                    self.discard(project_id)
+                else:
+                    self.put(project_id, _project_texts(project))
@@ -1,9 +1,35 @@
 from __future__ import annotations
 
 import uuid
-from typing import List, Optional
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
 
+from .file_links import PathStatus, check_paths
 from .models import FileLink, Project
+from .repository import ProjectRepository
+
+ROLE_LABELS = {"client": "当事人", "opponent": "相对人"}
+# 编辑表单中可修改的字段，合并并发修改时逐个比较
+EDITABLE_FIELDS = {
+    "name": "项目名称",
+    "client": "当事人",
+    "opponent": "相对人",
+    "lawyer": "承办律师",
+    "stage": "阶段",
+    "completion": "完成情况",
+    "status": "状态",
+    "notes": "备注",
+    "files": "附件",
+}
+
+
+@dataclass
+class ConflictHit:
+    project: Project
+    party: str
+    role: str
+    # 新当事人曾为相对人（或新相对人曾为当事人）时为 True，同一立场的重复出现仅作提示
+    conflict: bool
 
 
 class ProjectService:
@@ -19,8 +45,12 @@ class ProjectService:
         notes: str,
         file_paths: List[str],
         project_id: Optional[str] = None,
+        statuses: Optional[Dict[str, PathStatus]] = None,
     ) -> Project:
-        files = [FileLink.from_path(path) for path in file_paths]
+        """statuses 为预先批量检查的路径状态（批量导入时整批只检查一次），缺省时当场检查"""
+        if statuses is None:
+            statuses = check_paths(file_paths)
+        files = [FileLink.from_path(path, is_folder=statuses[path].is_dir) for path in file_paths]
         return Project(
             id=project_id or uuid.uuid4().hex,
             name=name,
@@ -33,3 +63,48 @@ class ProjectService:
             notes=notes,
             files=files,
         )
+
+    def check_conflicts(
+        self,
+        repo: ProjectRepository,
+        client: str,
+        opponent: str,
+        exclude_id: Optional[str] = None,
+    ) -> List[ConflictHit]:
+        """利益冲突检索：列出新当事人、新相对人在既有项目中出现的位置，冲突项排在前面"""
+        hits = []
+        for party, new_role in ((client, "client"), (opponent, "opponent")):
+            if not party.strip():
+                continue
+            for project, roles in repo.find_parties(party):
+                if project.id == exclude_id:
+                    continue
+                for role in sorted(roles):
+                    hits.append(ConflictHit(project=project, party=party, role=role, conflict=role != new_role))
+        hits.sort(key=lambda hit: not hit.conflict)
+        return hits
+
+
+def merge_changes(base: Project, mine: Project, latest: Project) -> Tuple[Project, List[str]]:
+    """三方合并：base 为开始编辑时的版本，mine 为本次提交，latest 为已被其它会话保存的最新版本。
+
+    只有一方修改的字段取修改后的值；双方都改成了不同值的字段以本次提交为准，并返回这些字段名。
+    合并结果的版本号取 latest 的，可以直接再次提交。
+    """
+    changes = {}
+    overlapping = []
+    for name in EDITABLE_FIELDS:
+        original, ours, theirs = _field(base, name), _field(mine, name), _field(latest, name)
+        if ours == original or ours == theirs:
+            continue
+        changes[name] = getattr(mine, name)
+        if theirs != original:
+            overlapping.append(name)
+    return replace(latest, **changes), overlapping
+
+
+def _field(project: Project, name: str) -> object:
+    # 附件按路径和类型比较，名称与扩展名由路径派生
+    if name == "files":
+        return [(file.path, file.is_folder) for file in project.files]
+    return getattr(project, name)
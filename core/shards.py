@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+from typing import ContextManager, List, Optional
+
+from .jsonl_storage import JsonlStorage
+from .storage import Signature, write_json_atomic
+
+MANIFEST_NAME = "manifest.jsonl"
+# 清单只保存看板需要的短字段；notes 和 files 只在分片中
+SUMMARY_FIELDS = (
+    "id",
+    "name",
+    "client",
+    "opponent",
+    "lawyer",
+    "stage",
+    "completion",
+    "status",
+    "created_at",
+    "updated_at",
+    "version",
+)
+# 可以直接用作文件名的项目编号；其它编号取摘要，摘要文件名以 "_" 开头，不会与前者重名
+_SAFE_ID = re.compile(r"[0-9A-Za-z][0-9A-Za-z_-]{0,99}")
+
+
+def summarize(item: dict) -> dict:
+    return {key: item[key] for key in SUMMARY_FIELDS if key in item}
+
+
+def _fsync_directory(directory: Path) -> None:
+    """让分片的改名先于清单落盘，崩溃后清单不会指向丢失的分片"""
+    if not hasattr(os, "O_DIRECTORY"):
+        # Windows 不能打开目录，也无需单独落盘
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class ShardedStorage:
+    """分片存储：每个项目一个 <id>.json，另有一份只含看板字段的清单 manifest.jsonl。
+
+    看板只读取清单（load_summaries），详情按 id 读取单个分片（get）；
+    写入只重写该项目的分片并向清单追加一行。分片先于清单写入，清单缺失时从全部分片重建。
+    每次写入都持有清单的文件锁，多个进程写入时分片与清单的顺序保持一致。
+    """
+
+    incremental = True
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        manifest_path = directory / MANIFEST_NAME
+        rebuild = not manifest_path.exists()
+        self.manifest = JsonlStorage(manifest_path)
+        if rebuild:
+            with self.write_lock():
+                self.rebuild_manifest()
+
+    def signature(self) -> Optional[Signature]:
+        # 每次写入都会追加清单，清单的签名即可反映所有修改
+        return self.manifest.signature()
+
+    def load_summaries(self) -> List[dict]:
+        return self.manifest.load()
+
+    def load(self) -> List[dict]:
+        """读取全部项目的完整记录；分片缺失或损坏时退回清单中的字段"""
+        items = []
+        for summary in self.manifest.load():
+            item = self.get(summary.get("id", ""))
+            items.append(item if item is not None else summary)
+        return items
+
+    def get(self, project_id: str) -> Optional[dict]:
+        try:
+            with self.shard_path(project_id).open("r", encoding="utf-8") as handle:
+                item = json.load(handle)
+        except (OSError, ValueError):
+            return None
+        return item if isinstance(item, dict) and item.get("id") == project_id else None
+
+    def save(self, data: List[dict]) -> None:
+        """整体重写全部分片和清单，并删除不再存在的项目的分片"""
+        with self.write_lock():
+            keep = set()
+            for item in data:
+                path = self.shard_path(item.get("id", ""))
+                write_json_atomic(path, item)
+                keep.add(path.name)
+            _fsync_directory(self.directory)
+            self.manifest.save([summarize(item) for item in data])
+            for path in self.directory.glob("*.json"):
+                if path.name not in keep:
+                    path.unlink(missing_ok=True)
+
+    def upsert(self, item: dict) -> None:
+        with self.write_lock():
+            write_json_atomic(self.shard_path(item.get("id", "")), item)
+            _fsync_directory(self.directory)
+            self.manifest.upsert(summarize(item))
+
+    def upsert_many(self, items: List[dict]) -> None:
+        """批量写入：分片逐个替换并 fsync，目录落盘一次后再向清单追加一次"""
+        with self.write_lock():
+            for item in items:
+                write_json_atomic(self.shard_path(item.get("id", "")), item)
+            _fsync_directory(self.directory)
+            self.manifest.upsert_many([summarize(item) for item in items])
+
+    def remove(self, project_id: str) -> None:
+        with self.write_lock():
+            self.manifest.remove(project_id)
+            self.shard_path(project_id).unlink(missing_ok=True)
+
+    def write_lock(self) -> ContextManager[None]:
+        # 所有写入都会追加清单，与清单共用一把文件锁
+        return self.manifest.write_lock()
+
+    def rebuild_manifest(self) -> None:
+        """扫描全部分片重新生成清单"""
+        summaries = []
+        for path in sorted(self.directory.glob("*.json")):
+            try:
+                item = json.loads(path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if isinstance(item, dict) and item.get("id"):
+                summaries.append(summarize(item))
+        self.manifest.save(summaries)
+
+    def shard_path(self, project_id: str) -> Path:
+        if _SAFE_ID.fullmatch(project_id):
+            return self.directory / f"{project_id}.json"
+        digest = hashlib.blake2b(project_id.encode("utf-8"), digest_size=16).hexdigest()
+        return self.directory / f"_{digest}.json"
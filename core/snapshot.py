@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+from itertools import islice
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from .enums import STATUSES
+from .models import FileLink, Project, paused_gc
+
+SNAPSHOT_FORMAT = 2
+# 文件布局：头部长度（4 字节小端）+ marshal 头部 + marshal 列数据
+_LENGTH_BYTES = 4
+HASH_ALGORITHM = "blake2b"
+# 列式布局的列顺序与 Project 构造参数一致（files 单独存放）
+PROJECT_COLUMNS = ("id", "name", "client", "opponent", "lawyer", "stage", "completion", "status", "notes")
+TIME_COLUMNS = ("created_at", "updated_at")
+VERSION_COLUMN = "version"
+# 重复度高的列在写入前驻留，marshal 会把同一个字符串只写一次
+INTERNED_COLUMNS = {"lawyer", "stage", "status"}
+
+# (格式版本, JSON 大小, JSON mtime_ns, JSON 摘要)
+Header = Tuple[int, int, int, str]
+
+
+def file_digest(path: Path) -> str:
+    with path.open("rb") as handle:
+        return hashlib.file_digest(handle, HASH_ALGORITHM).hexdigest()
+
+
+def snapshot_path(source: Path) -> Path:
+    return source.with_name(f"{source.name}.snapshot")
+
+
+def write_snapshot(source: Path, items: List[dict], digest: Optional[str] = None) -> None:
+    """把记录写成列式 marshal 快照，头部记录 JSON 文件的大小、mtime 和内容摘要"""
+    try:
+        stat = os.stat(source)
+    except FileNotFoundError:
+        return
+    if digest is None:
+        digest = file_digest(source)
+    header: Header = (SNAPSHOT_FORMAT, stat.st_size, stat.st_mtime_ns, digest)
+    _dump(snapshot_path(source), header, _columns(items))
+
+
+def read_snapshot(source: Path) -> Optional[List[Project]]:
+    """快照与 JSON 文件一致时直接构造项目，否则返回 None。
+
+    大小和 mtime 都相同即视为一致；只有 mtime 变化（例如文件被复制或 touch）时才计算摘要比对，
+    内容确实未变则刷新快照头部。
+    """
+    target = snapshot_path(source)
+    try:
+        stat = os.stat(source)
+        with target.open("rb") as handle:
+            length = int.from_bytes(handle.read(_LENGTH_BYTES), "little")
+            header = marshal.loads(handle.read(length))
+            if header[0] != SNAPSHOT_FORMAT or header[1] != stat.st_size:
+                return None
+            refresh = header[2] != stat.st_mtime_ns
+            if refresh and header[3] != file_digest(source):
+                return None
+            # 一次读入后用 loads 解码；marshal.load 直接读文件对象时会逐段小块读取，慢得多
+            body = handle.read()
+        with paused_gc():
+            columns = marshal.loads(body)
+            projects = _projects(columns)
+    except (OSError, EOFError, ValueError, TypeError, IndexError):
+        return None
+    if refresh:
+        _dump(target, (SNAPSHOT_FORMAT, stat.st_size, stat.st_mtime_ns, header[3]), columns)
+    return projects
+
+
+def _columns(items: List[dict]) -> tuple:
+    intern = sys.intern
+    columns = []
+    for name in PROJECT_COLUMNS + TIME_COLUMNS + (VERSION_COLUMN,):
+        if name in ("completion", VERSION_COLUMN):
+            columns.append([int(item.get(name, 0) or 0) for item in items])
+        elif name == "status":
+            columns.append([intern(item.get(name, STATUSES[0])) for item in items])
+        elif name in INTERNED_COLUMNS:
+            columns.append([intern(item.get(name, "")) for item in items])
+        else:
+            columns.append([item.get(name, "") for item in items])
+    files = [file for item in items for file in item.get("files") or ()]
+    file_columns = [
+        [file.get("path", "") for file in files],
+        [file.get("name", "") for file in files],
+        [intern(file.get("extension", "")) for file in files],
+        [bool(file.get("is_folder", False)) for file in files],
+    ]
+    counts = [len(item.get("files") or ()) for item in items]
+    return tuple(columns), counts, tuple(file_columns)
+
+
+def _projects(columns: tuple) -> List[Project]:
+    project_columns, counts, file_columns = columns
+    ids, names, clients, opponents, lawyers, stages, completions, statuses, notes, created, updated, versions = project_columns
+    file_rows = zip(*file_columns)
+    new_file = FileLink
+    new_project = Project
+    return [
+        new_project(
+            ids[index],
+            names[index],
+            clients[index],
+            opponents[index],
+            lawyers[index],
+            stages[index],
+            completions[index],
+            statuses[index],
+            notes[index],
+            [new_file(*row) for row in islice(file_rows, count)],
+            created[index],
+            updated[index],
+            versions[index],
+        )
+        for index, count in enumerate(counts)
+    ]
+
+
+def _dump(target: Path, header: Header, columns: tuple) -> None:
+    # 快照只是缓存，写入失败（例如磁盘已满）时保留 JSON 即可，下次启动会重建
+    header_bytes = marshal.dumps(header)
+    try:
+        # 临时文件名唯一，多个进程同时重建快照时互不覆盖（不能用 storage.create_temp，storage 依赖本模块）
+        fd, name = tempfile.mkstemp(dir=target.parent, prefix=f"{target.name}.", suffix=".tmp")
+    except OSError:
+        return
+    temp_path = Path(name)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            if hasattr(os, "fchmod"):
+                os.fchmod(handle.fileno(), 0o644)
+            handle.write(len(header_bytes).to_bytes(_LENGTH_BYTES, "little"))
+            handle.write(header_bytes)
+            handle.write(marshal.dumps(columns))
+        os.replace(temp_path, target)
+    except OSError:
+        temp_path.unlink(missing_ok=True)
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .storage import JsonStorage, Signature, WriteConflict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL DEFAULT '',
+    client TEXT NOT NULL DEFAULT '',
+    opponent TEXT NOT NULL DEFAULT '',
+    lawyer TEXT NOT NULL DEFAULT '',
+    stage TEXT NOT NULL DEFAULT '',
+    completion INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT '',
+    notes TEXT NOT NULL DEFAULT '',
+    created_at TEXT NOT NULL DEFAULT '',
+    updated_at TEXT NOT NULL DEFAULT '',
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS file_links (
+    project_id TEXT NOT NULL REFERENCES projects(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL DEFAULT '',
+    name TEXT NOT NULL DEFAULT '',
+    extension TEXT NOT NULL DEFAULT '',
+    is_folder INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (project_id, position)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_projects_status ON projects(status);
+CREATE INDEX IF NOT EXISTS idx_projects_lawyer ON projects(lawyer);
+CREATE INDEX IF NOT EXISTS idx_projects_updated_at ON projects(updated_at);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', 0);
+"""
+
+PROJECT_COLUMNS = [
+    "id",
+    "name",
+    "client",
+    "opponent",
+    "lawyer",
+    "stage",
+    "completion",
+    "status",
+    "notes",
+    "created_at",
+    "updated_at",
+    "version",
+]
+SEARCH_COLUMNS = ["name", "client", "opponent", "lawyer"]
+ORDER_COLUMNS = ["updated_at", "created_at", "name", "client", "lawyer", "completion"]
+
+
+class SqliteStorage:
+    """基于标准库 sqlite3（WAL 模式）的存储后端，筛选与排序下推到 SQL 中完成"""
+
+    incremental = True
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Streamlit 在不同线程中执行脚本，连接由锁保护后跨线程共享
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA foreign_keys=ON")
+        self._conn.executescript(SCHEMA)
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(projects)")}
+        if "version" not in columns:
+            # 早期创建的数据库没有版本号列
+            self._conn.execute("ALTER TABLE projects ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+
+    def signature(self) -> Optional[Signature]:
+        """每次写入递增的修订号，其它进程的写入同样可见"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()
+        return (row[0],)
+
+    def load(self) -> List[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(PROJECT_COLUMNS)} FROM projects ORDER BY updated_at DESC, created_at DESC"
+            ).fetchall()
+            file_rows = self._conn.execute(
+                "SELECT project_id, path, name, extension, is_folder FROM file_links ORDER BY project_id, position"
+            ).fetchall()
+        files: Dict[str, List[dict]] = {}
+        for row in file_rows:
+            files.setdefault(row["project_id"], []).append(
+                {
+                    "path": row["path"],
+                    "name": row["name"],
+                    "extension": row["extension"],
+                    "is_folder": bool(row["is_folder"]),
+                }
+            )
+        data = []
+        for row in rows:
+            item = dict(row)
+            item["files"] = files.get(item["id"], [])
+            data.append(item)
+        return data
+
+    def get(self, project_id: str) -> Optional[dict]:
+        """按主键读取单个项目"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(PROJECT_COLUMNS)} FROM projects WHERE id = ?", (project_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            file_rows = self._conn.execute(
+                "SELECT path, name, extension, is_folder FROM file_links WHERE project_id = ? ORDER BY position",
+                (project_id,),
+            ).fetchall()
+        item = dict(row)
+        item["files"] = [
+            {"path": link["path"], "name": link["name"], "extension": link["extension"], "is_folder": bool(link["is_folder"])}
+            for link in file_rows
+        ]
+        return item
+
+    def save(self, data: List[dict]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM file_links")
+            self._conn.execute("DELETE FROM projects")
+            for item in data:
+                self._write(item)
+            self._bump_revision()
+
+    def upsert(self, item: dict) -> None:
+        with self._lock, self._conn:
+            self._write(item)
+            self._bump_revision()
+
+    def upsert_many(self, items: List[dict]) -> None:
+        """批量写入在同一个事务中完成"""
+        with self._lock, self._conn:
+            for item in items:
+                self._write(item)
+            self._bump_revision()
+
+    def upsert_checked(self, items: List[dict]) -> None:
+        """按版本号批量写入：版本号为 0 的是新项目，编号不能已存在；其余项目在存储中的版本号须比写入的小 1。
+        任一项目不符时整个事务回滚并抛出 WriteConflict，多个进程同时保存也不会互相覆盖"""
+        with self._lock, self._conn:
+            for item in items:
+                self._write(item, checked=True)
+            self._bump_revision()
+
+    def remove(self, project_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM projects WHERE id = ?", (project_id,))
+            self._bump_revision()
+
+    def remove_checked(self, project_id: str, version: int) -> None:
+        """只在存储中的版本号仍为 version 时删除，否则抛出 WriteConflict"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM projects WHERE id = ? AND version = ?", (project_id, version))
+            if cursor.rowcount == 0:
+                raise WriteConflict(project_id)
+            self._bump_revision()
+
+    def query(
+        self,
+        status: Optional[str] = None,
+        lawyer: Optional[str] = None,
+        client: Optional[str] = None,
+        keyword: Optional[str] = None,
+        order_by: str = "-updated_at",
+        limit: Optional[int] = None,
+        offset: int = 0,
+    ) -> List[str]:
+        """与 ProjectRepository.query 语义一致的 SQL 查询，返回项目 id"""
+        clauses = []
+        params: List[object] = []
+        for column, value in (("status", status), ("lawyer", lawyer), ("client", client)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        needle = (keyword or "").strip()
+        if needle:
+            pattern = "%" + needle.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            clauses.append("(" + " OR ".join(f"{column} LIKE ? ESCAPE '\\'" for column in SEARCH_COLUMNS) + ")")
+            params.extend([pattern] * len(SEARCH_COLUMNS))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        field = order_by.lstrip("-")
+        if field not in ORDER_COLUMNS:
+            raise ValueError(f"不支持的排序字段：{order_by}")
+        direction = "DESC" if order_by.startswith("-") else "ASC"
+        sql = f"SELECT id FROM projects {where} ORDER BY {field} {direction}, id {direction}"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([-1 if limit is None else limit, offset])
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _write(self, item: dict, checked: bool = False) -> None:
+        values = {column: item.get(column, "") for column in PROJECT_COLUMNS}
+        values["completion"] = int(item.get("completion", 0) or 0)
+        values["version"] = int(item.get("version", 0) or 0)
+        # 与 list() 的排序键 updated_at or created_at 保持一致，使排序可以直接走索引
+        values["updated_at"] = values["updated_at"] or values["created_at"]
+        row = [values[column] for column in PROJECT_COLUMNS]
+        insert = f"INSERT INTO projects ({', '.join(PROJECT_COLUMNS)}) VALUES ({', '.join('?' for _ in PROJECT_COLUMNS)})"
+        if not checked:
+            assignments = ", ".join(f"{column} = excluded.{column}" for column in PROJECT_COLUMNS[1:])
+            self._conn.execute(f"{insert} ON CONFLICT(id) DO UPDATE SET {assignments}", row)
+        elif values["version"] == 0:
+            try:
+                self._conn.execute(insert, row)
+            except sqlite3.IntegrityError:
+                raise WriteConflict(values["id"]) from None
+        else:
+            assignments = ", ".join(f"{column} = ?" for column in PROJECT_COLUMNS[1:])
+            cursor = self._conn.execute(
+                f"UPDATE projects SET {assignments} WHERE id = ? AND version = ?",
+                row[1:] + [values["id"], values["version"] - 1],
+            )
+            if cursor.rowcount == 0:
+                raise WriteConflict(values["id"])
+        self._conn.execute("DELETE FROM file_links WHERE project_id = ?", (values["id"],))
+        self._conn.executemany(
+            "INSERT INTO file_links (project_id, position, path, name, extension, is_folder) VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    values["id"],
+                    position,
+                    link.get("path", ""),
+                    link.get("name", ""),
+                    link.get("extension", ""),
+                    int(bool(link.get("is_folder", False))),
+                )
+                for position, link in enumerate(item.get("files", []))
+            ],
+        )
+
+    def _bump_revision(self) -> None:
+        self._conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+
+
+def migrate_json_to_sqlite(json_path: Path, db_path: Path) -> int:
+    """把 projects.json 一次性导入 SQLite，返回导入的项目数量"""
+    data = JsonStorage(json_path).load()
+    storage = SqliteStorage(db_path)
+    try:
+        storage.save(data)
+    finally:
+        storage.close()
+    return len(data)
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="把 projects.json 迁移到 SQLite 数据库")
+    parser.add_argument("json_path", type=Path, help="源 JSON 文件，例如 data/projects.json")
+    parser.add_argument("db_path", type=Path, help="目标数据库文件，例如 data/projects.db")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+    count = migrate_json_to_sqlite(args.json_path, args.db_path)
+    print(f"已迁移 {count} 个项目到 {args.db_path}")
+
+
+if __name__ == "__main__":
+    main()
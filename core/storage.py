@@ -1,25 +1,192 @@
+import hashlib
 import json
+import os
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import ContextManager, Iterator, List, Optional, Protocol, Tuple
+
+from .json_stream import RecordError, iter_json_array
+from .models import Project, decode_projects, paused_gc
+from .snapshot import HASH_ALGORITHM, read_snapshot, write_snapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，单机单进程时无需加锁
+    fcntl = None  # type: ignore[assignment]
+
+Signature = Tuple[int, ...]
+
+
+class Storage(Protocol):
+    """存储后端接口。
+
+    incremental 为 True 的后端还需实现 upsert()/remove()；
+    能直接构造模型的后端可以额外提供 load_projects()，仓库会优先使用；
+    提供 load_summaries() 和 get() 的后端只加载看板字段，其余字段由仓库按需补全。
+    多个进程可以共享的文件后端提供 write_lock()，仓库在“刷新 → 比较版本 → 写入”期间持有它；
+    upsert_checked() 在存储内部比较版本号，冲突时抛出 WriteConflict。
+    """
+
+    incremental: bool
+
+    def signature(self) -> Optional[Signature]: ...
+
+    def load(self) -> List[dict]: ...
+
+    def save(self, data: List[dict]) -> None: ...
+
+
+class WriteConflict(Exception):
+    """按版本号写入时存储中的项目已被其它进程修改"""
+
+    def __init__(self, project_id: str) -> None:
+        super().__init__(f"项目 {project_id} 已被其它进程修改")
+        self.project_id = project_id
+
+
+class FileLock:
+    """跨进程的文件锁：对旁路的 .lock 文件加 fcntl 锁，同一线程内可重入。
+
+    进程内的线程由 RLock 串行化；嵌套调用沿用最外层的锁，不会把共享锁升级为排他锁。
+    没有 fcntl 时只在进程内加锁。
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    @contextmanager
+    def hold(self, exclusive: bool = True) -> Iterator[None]:
+        with self._lock:
+            if self._depth or fcntl is None:
+                self._depth += 1
+                try:
+                    yield
+                finally:
+                    self._depth -= 1
+                return
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._depth = 1
+                try:
+                    yield
+                finally:
+                    self._depth = 0
+            finally:
+                # 关闭文件描述符即释放 flock
+                os.close(fd)
+
+
+def stat_signature(path: Path) -> Optional[Signature]:
+    """返回文件的 (mtime, size, inode)，文件不存在时为 None"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def create_temp(path: Path) -> Tuple[int, Path]:
+    """在 path 同目录创建唯一命名的临时文件，返回 (文件描述符, 路径)。
+
+    多个进程同时写同一个文件时各自的临时文件互不覆盖。权限沿用原文件（新文件为 0644），
+    避免 mkstemp 默认的 0600 让其它用户的进程读不到替换后的文件。
+    """
+    fd, name = tempfile.mkstemp(dir=path.parent, prefix=f"{path.name}.", suffix=".tmp")
+    try:
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        if hasattr(os, "fchmod"):
+            os.fchmod(fd, mode)
+    except BaseException:
+        os.close(fd)
+        os.unlink(name)
+        raise
+    return fd, Path(name)
+
+
+def write_json_atomic(path: Path, data: object, indent: Optional[int] = 2) -> str:
+    """先写临时文件再替换，避免写入中途崩溃导致数据文件被截断；返回写入内容的摘要"""
+    content = json.dumps(data, ensure_ascii=False, indent=indent).encode("utf-8")
+    fd, temp_path = create_temp(path)
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            handle.write(content)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return hashlib.new(HASH_ALGORITHM, content).hexdigest()
 
 
 class JsonStorage:
+    # 不支持单条记录写入，仓库每次写入都会调用 save() 重写整个文件
+    incremental = False
+
     def __init__(self, path: Path) -> None:
         self.path = path
         self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.load_errors: List[RecordError] = []
+        self.lock = FileLock(path.with_name(f"{path.name}.lock"))
+
+    def signature(self) -> Optional[Signature]:
+        return stat_signature(self.path)
 
     def load(self) -> List[dict]:
+        """逐条流式解析；损坏的记录会被跳过并记录到 load_errors，其余记录照常返回"""
+        with paused_gc():
+            return list(self.iter_records())
+
+    def iter_records(self) -> Iterator[dict]:
+        self.load_errors = []
         if not self.path.exists():
-            return []
-        try:
-            with self.path.open("r", encoding="utf-8") as handle:
-                data = json.load(handle)
-        except json.JSONDecodeError:
-            return []
-        if not isinstance(data, list):
-            return []
-        return data
+            return
+        with self.path.open("r", encoding="utf-8") as handle:
+            yield from iter_json_array(handle, self.load_errors, validate=_check_record)
+
+    def load_projects(self) -> List[Project]:
+        """优先读取 projects.json.snapshot 列式快照；快照缺失或过期时解析 JSON 并重建快照"""
+        projects = read_snapshot(self.path)
+        if projects is not None:
+            return projects
+        data = self.load()
+        if data and not self.load_errors:
+            # 有损坏记录时不写快照，否则下次启动会跳过解析，错误提示也随之消失
+            write_snapshot(self.path, data)
+        return decode_projects(data)
 
     def save(self, data: List[dict]) -> None:
-        with self.path.open("w", encoding="utf-8") as handle:
-            json.dump(data, handle, ensure_ascii=False, indent=2)
+        with self.lock.hold():
+            self.preserve_corrupt()
+            digest = write_json_atomic(self.path, data)
+            write_snapshot(self.path, data, digest)
+
+    def write_lock(self) -> ContextManager[None]:
+        return self.lock.hold()
+
+    def preserve_corrupt(self) -> Optional[Path]:
+        """上次加载时有记录无法解析，则在覆盖前把原文件另存一份，便于人工恢复"""
+        if not self.load_errors or not self.path.exists():
+            return None
+        stamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        backup = self.path.with_name(f"{self.path.name}.corrupt-{stamp}")
+        shutil.copy2(self.path, backup)
+        self.load_errors = []
+        return backup
+
+
+def _check_record(item: dict) -> Optional[str]:
+    project_id = item.get("id")
+    if not isinstance(project_id, str) or not project_id:
+        return "缺少项目编号 id（可用 python -m core.migrate 补全）"
+    return None
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple
+
+from .file_links import path_status_cache
+from .models import Project
+
+DEFAULT_POLL_INTERVAL = 1.0
+DEFAULT_BATCH_SIZE = 250
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_IGNORED = 0x00008000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """通过 ctypes 调用 libc 的 inotify，监听附件所在目录的增删和移动"""
+
+    def __init__(self, libc: ctypes.CDLL, fd: int) -> None:
+        self._libc = libc
+        self.fd = fd
+        self._dirs: Dict[int, str] = {}
+        self._watches: Dict[str, int] = {}
+        # 达到 max_user_watches 上限后不再尝试，其余目录仅靠轮询
+        self.exhausted = False
+
+    @classmethod
+    def create(cls) -> Optional["_Inotify"]:
+        if not hasattr(select, "select") or os.name != "posix":
+            return None
+        name = ctypes.util.find_library("c")
+        if not name:
+            return None
+        try:
+            libc = ctypes.CDLL(name, use_errno=True)
+            init = libc.inotify_init1
+        except (OSError, AttributeError):
+            return None
+        fd = init(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        return cls(libc, fd)
+
+    def __len__(self) -> int:
+        return len(self._watches)
+
+    def watch(self, directory: str, mask: int = WATCH_MASK) -> bool:
+        if directory in self._watches:
+            return True
+        if self.exhausted:
+            return False
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if wd < 0:
+            if ctypes.get_errno() == 28:  # ENOSPC：监听数量已达上限
+                self.exhausted = True
+            return False
+        self._dirs[wd] = directory
+        self._watches[directory] = wd
+        return True
+
+    def unwatch(self, directory: str) -> None:
+        wd = self._watches.pop(directory, None)
+        if wd is None:
+            return
+        self._dirs.pop(wd, None)
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout: float) -> List[Tuple[str, str, int]]:
+        """等待最多 timeout 秒，返回 (目录, 文件名, 事件掩码)"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buffer):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset : offset + length].rstrip(b"\0")
+            offset += length
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                self._watches.pop(directory, None)
+            events.append((directory, os.fsdecode(name), mask))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class LinkWatcher:
+    """后台线程维护所有项目附件的“失效链接”表。
+
+    支持 inotify 时监听附件所在目录，本机上的删除和移动会立即反映；
+    其余情况（包括网络共享盘上的远程改动）按批轮询，每个周期最多 stat batch_size 个路径，
+    CPU 开销与附件总数无关。看板只读取内存中的结果，渲染时不做任何文件系统 I/O。
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        use_inotify: bool = True,
+    ) -> None:
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._owners: Dict[str, Set[str]] = {}
+        self._project_paths: Dict[str, List[str]] = {}
+        self._broken: Set[str] = set()
+        self._urgent: Deque[str] = deque()
+        self._order: List[str] = []
+        self._order_dirty = False
+        self._cursor = 0
+        # 目录 → 其下被跟踪的附件数量，数量归零时取消 inotify 监听
+        self._dir_refs: Dict[str, int] = {}
+        self._watched: Set[str] = set()
+        self._inotify = _Inotify.create() if use_inotify else None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify is not None else "polling"
+
+    # 与 ProjectIndex 相同的接口，由 ProjectRepository 在加载和写入时调用
+    def rebuild(self, projects: Iterable[Project]) -> None:
+        with self._lock:
+            projects = list(projects)
+            current = {project.id for project in projects}
+            for project_id in [item for item in self._project_paths if item not in current]:
+                self._set_paths(project_id, [])
+            for project in projects:
+                self._set_paths(project.id, [file.path for file in project.files])
+
+    def add(self, project: Project) -> None:
+        with self._lock:
+            self._set_paths(project.id, [file.path for file in project.files])
+
+    def remove(self, project_id: str) -> None:
+        with self._lock:
+            self._set_paths(project_id, [])
+
+    def broken_paths(self, project_id: str) -> List[str]:
+        with self._lock:
+            return [path for path in self._project_paths.get(project_id, []) if path in self._broken]
+
+    def broken_projects(self) -> Dict[str, List[str]]:
+        with self._lock:
+            result: Dict[str, List[str]] = {}
+            for path in self._broken:
+                for project_id in self._owners.get(path, ()):
+                    result.setdefault(project_id, []).append(path)
+            return result
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "tracked": len(self._owners),
+                "broken": len(self._broken),
+                "watches": len(self._inotify) if self._inotify is not None else 0,
+                "pending": len(self._urgent),
+            }
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="link-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def scan_once(self) -> None:
+        """处理一轮 inotify 事件、待检查路径和一批轮询路径"""
+        if self._inotify is not None:
+            self._handle_events(self._inotify.read(0))
+        self._check(self._next_batch())
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self._inotify is not None:
+                self._handle_events(self._inotify.read(self.poll_interval))
+            else:
+                self._stop.wait(self.poll_interval)
+            self._check(self._next_batch())
+
+    def _set_paths(self, project_id: str, paths: List[str]) -> None:
+        """只对新增和移除的路径做增减，未变化路径的检查结果保持不变"""
+        new_paths = list(dict.fromkeys(path for path in paths if path))
+        old_paths = self._project_paths.pop(project_id, [])
+        if new_paths:
+            self._project_paths[project_id] = new_paths
+        new_set = set(new_paths)
+        for path in old_paths:
+            if path not in new_set:
+                self._release_path(path, project_id)
+        old_set = set(old_paths)
+        for path in new_paths:
+            if path not in old_set:
+                self._acquire_path(path, project_id)
+
+    def _acquire_path(self, path: str, project_id: str) -> None:
+        owners = self._owners.get(path)
+        if owners is None:
+            owners = self._owners[path] = set()
+            self._order_dirty = True
+            self._urgent.append(path)
+            directory = os.path.dirname(path)
+            self._dir_refs[directory] = self._dir_refs.get(directory, 0) + 1
+        owners.add(project_id)
+
+    def _release_path(self, path: str, project_id: str) -> None:
+        owners = self._owners.get(path)
+        if owners is None:
+            return
+        owners.discard(project_id)
+        if owners:
+            return
+        del self._owners[path]
+        self._broken.discard(path)
+        self._order_dirty = True
+        directory = os.path.dirname(path)
+        refs = self._dir_refs.get(directory, 0) - 1
+        if refs > 0:
+            self._dir_refs[directory] = refs
+            return
+        self._dir_refs.pop(directory, None)
+        if self._inotify is not None and directory in self._watched:
+            self._watched.discard(directory)
+            self._inotify.unwatch(directory)
+
+    def _next_batch(self) -> List[str]:
+        with self._lock:
+            batch: List[str] = []
+            while self._urgent and len(batch) < self.batch_size:
+                path = self._urgent.popleft()
+                if path in self._owners:
+                    batch.append(path)
+            if self._order_dirty:
+                self._order = list(self._owners)
+                self._order_dirty = False
+                self._cursor = 0
+            remaining = self.batch_size - len(batch)
+            if self._order and remaining > 0:
+                end = self._cursor + remaining
+                batch.extend(self._order[self._cursor : end])
+                if end >= len(self._order):
+                    batch.extend(self._order[: end - len(self._order)])
+                self._cursor = end % len(self._order)
+            return batch
+
+    def _check(self, paths: List[str]) -> None:
+        if not paths:
+            return
+        statuses = path_status_cache.check_many(paths, refresh=True)
+        with self._lock:
+            for path, status in statuses.items():
+                if path not in self._owners:
+                    continue
+                if status.exists:
+                    self._broken.discard(path)
+                else:
+                    self._broken.add(path)
+                self._ensure_dir(os.path.dirname(path))
+
+    def _handle_events(self, events: List[Tuple[str, str, int]]) -> None:
+        if not events:
+            return
+        with self._lock:
+            for directory, name, mask in events:
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    # 目录本身被删除或移动，重新检查其下所有附件
+                    prefix = directory.rstrip(os.sep) + os.sep
+                    self._urgent.extend(path for path in self._owners if path.startswith(prefix))
+                    continue
+                path = os.path.join(directory, name)
+                if path in self._owners:
+                    self._urgent.append(path)
+
+    def _ensure_dir(self, directory: str) -> None:
+        # 调用方已持有 self._lock
+        if self._inotify is None or directory in self._watched or directory not in self._dir_refs:
+            return
+        if self._inotify.watch(directory):
+            self._watched.add(directory)
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .storage import Signature, Storage
+
+DEFAULT_DELAY = 0.5
+DEFAULT_RETRY_INTERVAL = 5.0
+
+
+class WriteBehindQueue:
+    """后台写入队列：仓库把修改放入队列后立即返回，由后台线程写入存储。
+
+    同一项目的多次修改只保留最后一次；整体重写（包括不支持单条写入的后端）在写入时
+    通过 snapshot() 取内存中的完整数据，一次原子写入覆盖之前排队的所有修改。
+    第一条修改入队后等待 delay 秒再写入，把连续的编辑合并为一次落盘。
+    写入失败时保留队列，隔 retry_interval 秒重试；进程正常退出前会写完队列。
+    写入成功后调用 on_flushed(写入前的存储签名)，供仓库判断期间是否有其它进程写入。
+    """
+
+    def __init__(
+        self,
+        storage: Storage,
+        snapshot: Callable[[], List[dict]],
+        on_flushed: Optional[Callable[[Optional[Signature]], None]] = None,
+        delay: float = DEFAULT_DELAY,
+        retry_interval: float = DEFAULT_RETRY_INTERVAL,
+    ) -> None:
+        self.storage = storage
+        self.snapshot = snapshot
+        self.on_flushed = on_flushed
+        self.delay = delay
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        # 写入过程由 _flush_lock 串行化；调用方持有仓库锁时不能等待它（snapshot 需要仓库锁）
+        self._flush_lock = threading.Lock()
+        self._drained = threading.Condition(self._lock)
+        # 项目编号 → 待写入的记录，None 表示删除
+        self._pending: Dict[str, Optional[dict]] = {}
+        self._full = False
+        self._in_flight = 0
+        self._queued = 0
+        self._flushes = 0
+        self._last_flush_ms = 0.0
+        self._max_flush_ms = 0.0
+        self._last_error = ""
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def put(self, item: dict) -> None:
+        self._enqueue(item.get("id", ""), item)
+
+    def remove(self, project_id: str) -> None:
+        self._enqueue(project_id, None)
+
+    def replace_all(self) -> None:
+        """下次写入时整体重写；之前排队的单条修改都已包含在内存数据中"""
+        with self._lock:
+            self._pending.clear()
+            self._full = True
+            self._queued += 1
+        self._wake.set()
+
+    def depth(self) -> int:
+        """尚未落盘的修改数，包括正在写入的"""
+        with self._lock:
+            return self._depth()
+
+    def flush(self) -> None:
+        """在当前线程写入队列中的全部修改"""
+        with self._flush_lock:
+            with self._lock:
+                full, pending = self._full, self._pending
+                self._full, self._pending = False, {}
+                self._in_flight = int(full) + len(pending)
+            if not self._in_flight:
+                return
+            started = time.perf_counter()
+            try:
+                if full:
+                    data = self.snapshot()
+                    before = self.storage.signature()
+                    self.storage.save(data)
+                else:
+                    before = self.storage.signature()
+                    items = [item for item in pending.values() if item is not None]
+                    upsert_many = getattr(self.storage, "upsert_many", None)
+                    if upsert_many is not None and items:
+                        upsert_many(items)
+                    else:
+                        for item in items:
+                            self.storage.upsert(item)
+                    for project_id, item in pending.items():
+                        if item is None:
+                            self.storage.remove(project_id)
+            except Exception as exc:
+                with self._lock:
+                    # 写入失败的修改放回队列，期间新入队的修改更新，优先保留
+                    self._full = self._full or full
+                    if not self._full:
+                        self._pending = {**pending, **self._pending}
+                    self._in_flight = 0
+                    self._last_error = f"{type(exc).__name__}: {exc}"
+                raise
+            elapsed = (time.perf_counter() - started) * 1000
+            if self.on_flushed is not None:
+                self.on_flushed(before)
+            with self._lock:
+                self._in_flight = 0
+                self._flushes += 1
+                self._last_flush_ms = elapsed
+                self._max_flush_ms = max(self._max_flush_ms, elapsed)
+                self._last_error = ""
+                if not self._depth():
+                    self._drained.notify_all()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待后台线程写完队列，返回是否已全部落盘"""
+        with self._lock:
+            return self._drained.wait_for(lambda: not self._depth(), timeout)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "depth": self._depth(),
+                "queued": self._queued,
+                "flushes": self._flushes,
+                "last_flush_ms": round(self._last_flush_ms, 1),
+                "max_flush_ms": round(self._max_flush_ms, 1),
+                "last_error": self._last_error,
+            }
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def stop(self) -> None:
+        """停止后台线程，返回前写完队列中剩余的修改"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        atexit.unregister(self.stop)
+        self.flush()
+
+    def _enqueue(self, project_id: str, item: Optional[dict]) -> None:
+        with self._lock:
+            self._pending[project_id] = item
+            self._queued += 1
+        self._wake.set()
+
+    def _depth(self) -> int:
+        return int(self._full) + len(self._pending) + self._in_flight
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait()
+            # 等待一小段时间，让连续的编辑合并到同一次写入
+            self._stop.wait(self.delay)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                self._stop.wait(self.retry_interval)
+                self._wake.set()
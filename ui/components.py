@@ -1,20 +1,23 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from datetime import datetime
+from typing import Dict, Optional
 
+import pandas as pd
 import streamlit as st
 
-from pathlib import Path
-
-from core.file_links import open_local_file
+from core.file_links import check_paths, open_local_file
+from core.manifest import FolderSummary
 from core.models import Project
+from core.preview import can_preview, preview_cache
+
+TABLE_COLUMNS = ["name", "client", "opponent", "lawyer", "stage", "completion", "status", "updated_at"]
 
 
-def render_metrics(projects: List[Project]) -> None:
-    total = len(projects)
-    processing = len([item for item in projects if item.status == "正在处理"])
-    closed = len([item for item in projects if item.status == "已结案"])
-    waiting = len([item for item in projects if item.status == "等待接手"])
+def render_metrics(total: int, counts: Dict[str, int]) -> None:
+    processing = counts.get("正在处理", 0)
+    closed = counts.get("已结案", 0)
+    waiting = counts.get("等待接手", 0)
 
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("全部项目", total)
@@ -23,28 +26,70 @@ def render_metrics(projects: List[Project]) -> None:
     col4.metric("等待接手", waiting)
 
 
-def render_project_table(projects: List[Project]) -> None:
-    table_rows = []
-    for item in projects:
-        table_rows.append(
-            {
-                "项目名称": item.name,
-                "当事人": item.client,
-                "相对人": item.opponent,
-                "承办律师": item.lawyer,
-                "阶段": item.stage,
-                "完成度": f"{item.completion}%",
-                "状态": item.status,
-                "更新时间": item.updated_at or item.created_at,
-            }
-        )
-    if not table_rows:
-        st.info("暂无项目，可以点击上方“新建项目”按钮创建。")
+def render_project_table(frame: pd.DataFrame) -> None:
+    """frame 为 ProjectFrame.select() 的结果，直接交给 st.dataframe，不逐行转换"""
+    if frame.empty:
+        st.info("没有符合条件的项目。")
         return
-    st.dataframe(table_rows, use_container_width=True, hide_index=True)
-
-
-def render_project_detail(project: Optional[Project]) -> None:
+    st.dataframe(
+        frame[TABLE_COLUMNS],
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "name": "项目名称",
+            "client": "当事人",
+            "opponent": "相对人",
+            "lawyer": "承办律师",
+            "stage": "阶段",
+            "completion": st.column_config.ProgressColumn("完成度", min_value=0, max_value=100, format="%d%%"),
+            "status": "状态",
+            "updated_at": "更新时间",
+        },
+    )
+
+
+def _format_size(size: int) -> str:
+    value = float(size)
+    for unit in ["B", "KB", "MB", "GB"]:
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+def render_folder_summary(summary: Optional[FolderSummary]) -> None:
+    if summary is None:
+        st.caption("文件夹索引生成中…")
+        return
+    st.caption(f"共 {summary.file_count} 个文件，{_format_size(summary.total_size)}（索引于 {summary.scanned_at}）")
+    if summary.recent:
+        with st.expander("最近修改的文件", expanded=False):
+            for relative, size, mtime_ns in summary.recent:
+                modified = datetime.fromtimestamp(mtime_ns / 1e9).strftime("%Y-%m-%d %H:%M")
+                st.caption(f"{modified}　{relative}（{_format_size(size)}）")
+
+
+def render_file_preview(path: str) -> None:
+    # 只读取文件开头几 KB，预览结果按 (路径, mtime) 缓存
+    preview = preview_cache.get(path)
+    if preview is None:
+        st.warning("无法读取该文件。")
+        return
+    if preview.binary:
+        st.caption("二进制内容，无法预览。")
+        return
+    st.code(preview.text or "（空文件）", language=None)
+    note = f"编码：{preview.encoding}，大小：{_format_size(preview.size)}"
+    if preview.truncated:
+        note += "，仅显示开头部分"
+    st.caption(note)
+
+
+def render_project_detail(
+    project: Optional[Project],
+    folder_summaries: Optional[Dict[str, Optional[FolderSummary]]] = None,
+    duplicate_notes: Optional[Dict[str, str]] = None,
+) -> None:
     if not project:
         st.info("请先选择一个项目查看详情。")
         return
@@ -69,12 +114,15 @@ def render_project_detail(project: Optional[Project]) -> None:
         st.caption("尚未添加文件或文件夹。")
         return
 
+    # 一次批量检查本项目所有附件路径，避免逐个同步 stat
+    statuses = check_paths([file.path for file in project.files])
     for index, file in enumerate(project.files):
         col_icon, col_name, col_action = st.columns([0.1, 0.7, 0.2])
         col_icon.write(file.icon())
         col_name.write(file.name)
         if col_action.button("打开", key=f"open_file_{project.id}_{index}"):
-            if file.path and Path(file.path).exists():
+            # 打开前重新检查，避免使用过期的缓存结果
+            if file.path and check_paths([file.path], refresh=True)[file.path].exists:
                 if file.is_folder:
                     from core.file_links import open_folder_in_finder
                     open_folder_in_finder(file.path)
@@ -84,5 +132,15 @@ def render_project_detail(project: Optional[Project]) -> None:
                 st.warning("路径无效，无法打开。")
         if not file.path:
             col_name.caption("路径为空")
-        elif not Path(file.path).exists():
+        elif not statuses[file.path].exists:
             col_name.caption("路径不存在")
+        elif file.is_folder and folder_summaries is not None:
+            with col_name:
+                render_folder_summary(folder_summaries.get(file.path))
+        else:
+            if duplicate_notes and file.path in duplicate_notes:
+                col_name.caption(duplicate_notes[file.path])
+            if not file.is_folder and can_preview(file.path):
+                if col_name.toggle("预览", key=f"preview_file_{project.id}_{index}"):
+                    with col_name:
+                        render_file_preview(file.path)
@@ -1,38 +1,131 @@
 from __future__ import annotations
 
+import io
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, Hashable, List, Optional, Tuple, TypeVar
 
 import streamlit as st
 
+from core.bulk import EXPORT_FORMATS, IMPORT_FORMATS, detect_format, export_stream, import_stream
+from core.config import WRITE_BEHIND, create_storage
 from core.enums import STATUSES
+from core.dedup import ContentHasher
+from core.extract import AttachmentTextIndexer
 from core.file_links import normalize_file_paths, resolve_missing_paths, select_local_files, select_local_folder
+from core.frame import ProjectFrame
+from core.manifest import FolderIndexer
 from core.models import Project
-from core.repository import ProjectRepository
-from core.service import ProjectService
-from ui.components import render_metrics, render_project_detail
+from core.notify import ChangeNotifier
+from core.repository import ProjectRepository, VersionConflict
+from core.service import EDITABLE_FIELDS, ROLE_LABELS, ProjectService, merge_changes
+from core.view_cache import ViewCache
+from core.watcher import LinkWatcher
+from ui.components import render_metrics, render_project_detail, render_project_table
 
 DATA_FILE = Path(__file__).resolve().parent.parent / "data" / "projects.json"
 CARD_FIELD_OPTIONS = ["当事人", "相对人", "阶段", "承办律师", "状态", "完成度"]
 DEFAULT_CARD_FIELDS = ["当事人", "相对人", "阶段"]
+PAGE_SIZE_OPTIONS = [10, 20, 50, 100]
+DEFAULT_PAGE_SIZE = 20
+# 已结案项目默认折叠，只显示数量和最近的若干个
+COLLAPSED_STATUSES = ["已结案"]
+CLOSED_PREVIEW_COUNT = 5
+# 保存时遇到并发修改，自动合并后重试的次数
+MERGE_ATTEMPTS = 3
+# 各会话检查是否有其它会话或进程保存了数据的间隔（秒）
+CHANGE_CHECK_SECONDS = 1
+# 对话框打开期间不自动刷新：整页重跑会关闭对话框，丢失正在填写的内容
+DIALOG_OPEN_KEY = "dialog_open"
+BOARD_VIEWS = ["卡片", "表格"]
+TABLE_ORDER_OPTIONS = {
+    "-updated_at": "最近更新",
+    "-created_at": "最近创建",
+    "name": "项目名称",
+    "client": "当事人",
+    "lawyer": "承办律师",
+    "-completion": "完成度从高到低",
+    "completion": "完成度从低到高",
+    "status": "状态",
+}
+# st.dataframe 一次最多传给浏览器的行数
+TABLE_ROW_LIMIT = 10000
+# 批量导入后最多列出的错误条数
+BULK_ERROR_PREVIEW = 50
+
+T = TypeVar("T")
+
+
+@st.cache_resource
+def get_change_notifier() -> ChangeNotifier:
+    """多个进程共享 data/ 目录时的变更通知，版本戳保存在 data/.changes"""
+    notifier = ChangeNotifier(DATA_FILE.parent / ".changes")
+    notifier.start()
+    return notifier
+
+
+@st.cache_resource
+def get_repository() -> ProjectRepository:
+    """进程内所有会话共享同一个仓库实例，只解析一次数据文件"""
+    return ProjectRepository(
+        DATA_FILE,
+        create_storage(DATA_FILE),
+        write_behind=WRITE_BEHIND,
+        notifier=get_change_notifier(),
+    )
+
+
+@st.cache_resource
+def get_link_watcher() -> LinkWatcher:
+    """后台维护所有附件的失效链接表，看板渲染时只读内存结果"""
+    watcher = LinkWatcher()
+    get_repository().attach(watcher)
+    watcher.start()
+    return watcher
+
+
+@st.cache_resource
+def get_folder_indexer() -> FolderIndexer:
+    """后台增量扫描文件夹附件，清单保存在 data/manifests/ 下"""
+    indexer = FolderIndexer(DATA_FILE.parent / "manifests")
+    get_repository().attach(indexer)
+    indexer.start()
+    return indexer
+
+
+@st.cache_resource
+def get_text_indexer() -> AttachmentTextIndexer:
+    """后台在进程池中抽取附件正文，抽取结果缓存在 data/extracted.db"""
+    indexer = AttachmentTextIndexer(DATA_FILE.parent / "extracted.db")
+    get_repository().attach(indexer)
+    indexer.start()
+    return indexer
+
 
+@st.cache_resource
+def get_content_hasher() -> ContentHasher:
+    """后台计算附件内容摘要用于查重，摘要缓存在 data/hashes.db"""
+    hasher = ContentHasher(DATA_FILE.parent / "hashes.db")
+    get_repository().attach(hasher)
+    hasher.start()
+    return hasher
 
-def _filter_projects(projects: List[Project], status: str, keyword: str) -> List[Project]:
-    result = projects
-    if status and status != "全部":
-        result = [item for item in result if item.status == status]
-    if keyword:
-        needle = keyword.strip().lower()
-        if needle:
-            result = [
-                item
-                for item in result
-                if needle in item.name.lower()
-                or needle in item.client.lower()
-                or needle in item.opponent.lower()
-                or needle in item.lawyer.lower()
-            ]
-    return result
+
+@st.cache_resource
+def get_project_frame() -> ProjectFrame:
+    """表格视图使用的列式数据，随仓库的加载和写入增量更新"""
+    frame = ProjectFrame()
+    get_repository().attach(frame)
+    return frame
+
+
+@st.cache_resource
+def get_view_cache() -> ViewCache:
+    return ViewCache()
+
+
+def _cached_view(repo: ProjectRepository, key: Tuple[Hashable, ...], compute: Callable[[], T]) -> T:
+    """按 (数据版本, 视图参数) 缓存派生视图，任一会话写入后版本变化即全部失效"""
+    return get_view_cache().get_or_compute((repo.data_version(),) + key, compute)
 
 
 def _append_selected_files(state_key: str) -> None:
@@ -57,6 +150,17 @@ def _ensure_state(key: str, value: object) -> None:
         st.session_state[key] = value
 
 
+def _set_state(key: str, value: object) -> None:
+    st.session_state[key] = value
+
+
+def _retain_options(key: str, options: List[str]) -> None:
+    # 其它会话修改数据后，已选中的承办律师或阶段可能不再存在
+    selected = st.session_state.get(key)
+    if selected and any(value not in options for value in selected):
+        st.session_state[key] = [value for value in selected if value in options]
+
+
 def _format_card_value(project: Project, label: str) -> str:
     if label == "项目名称":
         return project.name or "未命名项目"
@@ -77,11 +181,38 @@ def _format_card_value(project: Project, label: str) -> str:
 
 @st.dialog("项目详情")
 def render_detail_dialog(project: Project) -> None:
-    render_project_detail(project)
+    st.session_state[DIALOG_OPEN_KEY] = True
+    # 看板上的项目可能只有清单字段，打开详情时读取完整记录
+    project = get_repository().get(project.id) or project
+    indexer = get_folder_indexer()
+    summaries = {file.path: indexer.summary(file.path) for file in project.files if file.is_folder}
+    render_project_detail(project, summaries, _duplicate_notes(project))
+
+
+def _duplicate_notes(project: Project) -> Dict[str, str]:
+    """附件查重提示：同一内容的其它路径，以及引用了该内容的其它项目"""
+    repo = get_repository()
+    hasher = get_content_hasher()
+    notes: Dict[str, str] = {}
+    for file in project.files:
+        if file.is_folder or not file.path:
+            continue
+        others = hasher.duplicates(file.path)
+        projects = [repo.get(project_id) for project_id in hasher.projects_sharing(file.path) if project_id != project.id]
+        names = [other.name for other in projects if other is not None]
+        parts = []
+        if others:
+            parts.append(f"另有 {len(others)} 个路径内容相同")
+        if names:
+            parts.append("同一文件也出现在：" + "、".join(names))
+        if parts:
+            notes[file.path] = "；".join(parts)
+    return notes
 
 
 @st.dialog("删除项目")
 def render_delete_dialog(repo: ProjectRepository, project: Project) -> None:
+    st.session_state[DIALOG_OPEN_KEY] = True
     st.error("删除后不可恢复。")
     st.caption(f"请输入项目名称以确认删除：{project.name}")
     confirmation = st.text_input("项目名称确认")
@@ -89,7 +220,12 @@ def render_delete_dialog(repo: ProjectRepository, project: Project) -> None:
         if confirmation != project.name:
             st.error("项目名称不匹配，未删除。")
             return
-        if repo.delete(project.id):
+        try:
+            deleted = repo.delete(project.id, expected_version=project.version)
+        except VersionConflict:
+            st.warning("该项目刚被其它会话修改过，请关闭窗口确认最新内容后再删除。")
+            return
+        if deleted:
             st.success("项目已删除。")
             st.rerun()
         else:
@@ -98,6 +234,8 @@ def render_delete_dialog(repo: ProjectRepository, project: Project) -> None:
 
 @st.dialog("编辑项目")
 def render_edit_dialog(repo: ProjectRepository, service: ProjectService, project: Project) -> None:
+    st.session_state[DIALOG_OPEN_KEY] = True
+    project = repo.get(project.id) or project
     prefix = f"edit_{project.id}"
     name_key = f"{prefix}_name"
     client_key = f"{prefix}_client"
@@ -108,16 +246,13 @@ def render_edit_dialog(repo: ProjectRepository, service: ProjectService, project
     status_key = f"{prefix}_status"
     notes_key = f"{prefix}_notes"
     file_paths_key = f"{prefix}_file_paths"
+    base_key = f"{prefix}_base"
+    conflict_key = f"{prefix}_conflict"
 
-    _ensure_state(name_key, project.name)
-    _ensure_state(client_key, project.client)
-    _ensure_state(opponent_key, project.opponent)
-    _ensure_state(lawyer_key, project.lawyer)
-    _ensure_state(stage_key, project.stage)
-    _ensure_state(completion_key, project.completion)
-    _ensure_state(status_key, project.status if project.status in STATUSES else STATUSES[0])
-    _ensure_state(notes_key, project.notes)
-    _ensure_state(file_paths_key, "\n".join([file.path for file in project.files]))
+    for field, value in _edit_values(project).items():
+        _ensure_state(f"{prefix}_{field}", value)
+    # 开始编辑时的版本：保存时据此检测其它会话的修改并做三方合并
+    _ensure_state(base_key, project)
 
     # 文件和文件夹选择按钮
     col_file, col_folder = st.columns(2)
@@ -148,6 +283,8 @@ def render_edit_dialog(repo: ProjectRepository, service: ProjectService, project
         submitted = st.form_submit_button("保存修改")
 
     if not submitted:
+        if conflict_key in st.session_state:
+            _render_edit_conflict(repo, prefix)
         return
 
     if not name.strip():
@@ -167,8 +304,15 @@ def render_edit_dialog(repo: ProjectRepository, service: ProjectService, project
         file_paths=file_paths,
         project_id=project.id,
     )
-    updated.created_at = project.created_at
-    repo.update(updated)
+    base = st.session_state[base_key]
+    updated.created_at = base.created_at
+    updated.version = base.version
+    st.session_state.pop(conflict_key, None)
+    if not _save_edit(repo, prefix, base, updated):
+        if conflict_key in st.session_state:
+            _render_edit_conflict(repo, prefix)
+        return
+    _clear_edit_state(prefix)
 
     missing = resolve_missing_paths(file_paths)
     if missing:
@@ -177,11 +321,78 @@ def render_edit_dialog(repo: ProjectRepository, service: ProjectService, project
     st.rerun()
 
 
-def render_dashboard(repo: ProjectRepository, service: ProjectService, projects: List[Project]) -> None:
+def _edit_values(project: Project) -> Dict[str, object]:
+    """编辑表单各字段的初始值，状态键为 edit_<项目编号>_<字段名>"""
+    return {
+        "name": project.name,
+        "client": project.client,
+        "opponent": project.opponent,
+        "lawyer": project.lawyer,
+        "stage": project.stage,
+        "completion": project.completion,
+        "status": project.status if project.status in STATUSES else STATUSES[0],
+        "notes": project.notes,
+        "file_paths": "\n".join([file.path for file in project.files]),
+    }
+
+
+def _clear_edit_state(prefix: str) -> None:
+    """保存成功后清除表单状态，下次打开时重新读取最新内容"""
+    for field in list(EDITABLE_FIELDS) + ["file_paths", "base", "conflict"]:
+        st.session_state.pop(f"{prefix}_{field}", None)
+
+
+def _save_edit(repo: ProjectRepository, prefix: str, base: Project, updated: Project) -> bool:
+    """提交编辑；其它会话在此期间保存过该项目时与其修改合并后重试，双方改了同一字段时交给用户决定"""
+    merged = False
+    for _ in range(MERGE_ATTEMPTS):
+        try:
+            repo.update(updated)
+        except VersionConflict as conflict:
+            latest = conflict.current
+        else:
+            if merged:
+                st.toast("其它会话刚修改过该项目，已与你的修改合并。")
+            return True
+        if latest is None:
+            st.error("该项目已被其它会话删除，修改未保存。")
+            return False
+        updated, overlapping = merge_changes(base, updated, latest)
+        if overlapping:
+            st.session_state[f"{prefix}_conflict"] = (updated, latest, overlapping)
+            return False
+        base = latest
+        merged = True
+    st.error("该项目正在被频繁修改，请稍后再保存。")
+    return False
+
+
+def _render_edit_conflict(repo: ProjectRepository, prefix: str) -> None:
+    merged, latest, fields = st.session_state[f"{prefix}_conflict"]
+    labels = "、".join(EDITABLE_FIELDS[field] for field in fields)
+    st.warning(f"保存期间其它会话也修改了：{labels}。可以用你的修改覆盖这些字段，或载入最新内容后重新编辑。")
+    col_keep, col_reload = st.columns(2)
+    col_reload.button("载入最新内容", key=f"{prefix}_reload", on_click=_load_latest, args=(prefix, latest))
+    if col_keep.button("保留我的修改", key=f"{prefix}_keep", type="primary"):
+        st.session_state.pop(f"{prefix}_conflict")
+        if _save_edit(repo, prefix, latest, merged):
+            _clear_edit_state(prefix)
+            st.toast("项目已更新。")
+            st.rerun()
+
+
+def _load_latest(prefix: str, latest: Project) -> None:
+    for field, value in _edit_values(latest).items():
+        st.session_state[f"{prefix}_{field}"] = value
+    st.session_state[f"{prefix}_base"] = latest
+    st.session_state.pop(f"{prefix}_conflict", None)
+
+
+def render_dashboard(repo: ProjectRepository, service: ProjectService) -> None:
     st.subheader("案件/项目看板")
     with st.sidebar:
         with st.expander("项目统计", expanded=True):
-            render_metrics(projects)
+            _render_metrics_panel(repo)
         with st.expander("卡片字段", expanded=False):
             selected = st.session_state.get("card_fields")
             if selected:
@@ -197,67 +408,155 @@ def render_dashboard(repo: ProjectRepository, service: ProjectService, projects:
                 key="card_fields",
                 help="可多选，项目名称始终显示在卡片顶部。",
             )
+            st.selectbox(
+                "每列每页卡片数",
+                PAGE_SIZE_OPTIONS,
+                index=PAGE_SIZE_OPTIONS.index(DEFAULT_PAGE_SIZE),
+                key="card_page_size",
+            )
+        with st.expander("批量导入/导出", expanded=False):
+            _render_bulk_panel(repo)
         
         # 危险区域
         with st.expander("⚠️ 危险区域", expanded=False):
-            st.warning("此区域包含危险操作，请谨慎使用！")
-            
-            # 初始化确认状态
-            if "delete_all_step" not in st.session_state:
+            _render_danger_zone(repo)
+
+    _render_board(repo, service)
+    _render_content_search(repo)
+
+
+@st.fragment
+def _render_metrics_panel(repo: ProjectRepository) -> None:
+    total, counts = _cached_view(
+        repo,
+        ("metrics",),
+        lambda: (repo.count(), {status: repo.count(status) for status in STATUSES}),
+    )
+    render_metrics(total, counts)
+    stats = repo.write_stats()
+    if stats is not None:
+        st.caption(f"待写入 {stats['depth']} 项 · 最近一次写入 {stats['last_flush_ms']} ms")
+        if stats["last_error"]:
+            st.caption(f"⚠️ 写入失败，稍后重试：{stats['last_error']}")
+
+
+@st.fragment
+def _render_bulk_panel(repo: ProjectRepository) -> None:
+    result = st.session_state.pop("bulk_result", None)
+    if result is not None:
+        message, errors = result
+        st.success(message)
+        if errors:
+            st.warning(f"跳过了 {len(errors)} 条记录：")
+            st.code("\n".join(errors[:BULK_ERROR_PREVIEW]), language=None)
+
+    uploaded = st.file_uploader("导入 CSV / JSONL", type=list(IMPORT_FORMATS), key="bulk_upload")
+    update_existing = st.checkbox("覆盖编号已存在的项目", key="bulk_update")
+    if uploaded is not None and st.button("开始导入", key="bulk_import", use_container_width=True):
+        bar = st.progress(0.0, text="正在读取…")
+
+        def report_progress(count: int) -> None:
+            # 按已读取的字节估算进度，上传的文件不必先数出总行数
+            bar.progress(min(uploaded.tell() / max(uploaded.size, 1), 1.0), text=f"已处理 {count} 条记录")
+
+        handle = io.TextIOWrapper(uploaded, encoding="utf-8-sig", newline="")
+        try:
+            report = import_stream(
+                repo,
+                handle,
+                detect_format(Path(uploaded.name)),
+                update_existing=update_existing,
+                progress=report_progress,
+            )
+        except (ValueError, VersionConflict, UnicodeDecodeError) as exc:
+            bar.empty()
+            st.error(f"导入失败：{exc}")
+            return
+        finally:
+            # 不随包装对象一起关闭上传的文件
+            handle.detach()
+        st.session_state["bulk_result"] = (f"新增 {report.added} 个项目，更新 {report.updated} 个项目", report.errors)
+        st.rerun()
+
+    export_format = st.selectbox("导出格式", EXPORT_FORMATS, key="bulk_export_format")
+    if st.button("生成导出文件", key="bulk_export", use_container_width=True):
+        buffer = io.StringIO()
+        count = export_stream(repo, buffer, export_format)
+        # CSV 带 BOM，便于 Excel 直接打开中文内容
+        encoding = "utf-8-sig" if export_format == "csv" else "utf-8"
+        st.session_state["bulk_export_file"] = (f"projects.{export_format}", buffer.getvalue().encode(encoding), count)
+    export_file = st.session_state.get("bulk_export_file")
+    if export_file is not None:
+        name, data, count = export_file
+        st.download_button(f"下载 {name}（{count} 个项目）", data, file_name=name, key="bulk_download", use_container_width=True)
+
+
+@st.fragment
+def _render_danger_zone(repo: ProjectRepository) -> None:
+    # 确认步骤的按钮只重跑本片段，执行删除后才重跑整个应用
+    st.warning("此区域包含危险操作，请谨慎使用！")
+    
+    # 初始化确认状态
+    if "delete_all_step" not in st.session_state:
+        st.session_state["delete_all_step"] = 0
+    
+    step = st.session_state["delete_all_step"]
+    
+    if step == 0:
+        st.button(
+            "🗑️ 删除全部项目",
+            type="secondary",
+            use_container_width=True,
+            on_click=_set_state,
+            args=("delete_all_step", 1),
+        )
+    elif step == 1:
+        st.error("⚠️ 第一次确认：你确定要删除所有项目吗？")
+        col1, col2 = st.columns(2)
+        col1.button("确认删除", type="primary", key="confirm_1", on_click=_set_state, args=("delete_all_step", 2))
+        col2.button("取消", key="cancel_1", on_click=_set_state, args=("delete_all_step", 0))
+    elif step == 2:
+        st.error("⚠️ 第二次确认：此操作不可恢复！")
+        col1, col2 = st.columns(2)
+        col1.button("我确定要删除", type="primary", key="confirm_2", on_click=_set_state, args=("delete_all_step", 3))
+        col2.button("取消", key="cancel_2", on_click=_set_state, args=("delete_all_step", 0))
+    elif step == 3:
+        st.error("⚠️ 最后确认：请输入 'DELETE' 以确认删除所有项目")
+        confirm_text = st.text_input("输入 DELETE 确认", key="delete_confirm_text")
+        col1, col2 = st.columns(2)
+        if col1.button("执行删除", type="primary", key="confirm_3"):
+            if confirm_text == "DELETE":
+                count = repo.delete_all()
                 st.session_state["delete_all_step"] = 0
-            
-            step = st.session_state["delete_all_step"]
-            
-            if step == 0:
-                if st.button("🗑️ 删除全部项目", type="secondary", use_container_width=True):
-                    st.session_state["delete_all_step"] = 1
-                    st.rerun()
-            elif step == 1:
-                st.error("⚠️ 第一次确认：你确定要删除所有项目吗？")
-                col1, col2 = st.columns(2)
-                if col1.button("确认删除", type="primary", key="confirm_1"):
-                    st.session_state["delete_all_step"] = 2
-                    st.rerun()
-                if col2.button("取消", key="cancel_1"):
-                    st.session_state["delete_all_step"] = 0
-                    st.rerun()
-            elif step == 2:
-                st.error("⚠️ 第二次确认：此操作不可恢复！")
-                col1, col2 = st.columns(2)
-                if col1.button("我确定要删除", type="primary", key="confirm_2"):
-                    st.session_state["delete_all_step"] = 3
-                    st.rerun()
-                if col2.button("取消", key="cancel_2"):
-                    st.session_state["delete_all_step"] = 0
-                    st.rerun()
-            elif step == 3:
-                st.error("⚠️ 最后确认：请输入 'DELETE' 以确认删除所有项目")
-                confirm_text = st.text_input("输入 DELETE 确认", key="delete_confirm_text")
-                col1, col2 = st.columns(2)
-                if col1.button("执行删除", type="primary", key="confirm_3"):
-                    if confirm_text == "DELETE":
-                        count = repo.delete_all()
-                        st.session_state["delete_all_step"] = 0
-                        st.success(f"已删除 {count} 个项目！")
-                        st.rerun()
-                    else:
-                        st.error("输入不正确，请输入 'DELETE'")
-                if col2.button("取消", key="cancel_3"):
-                    st.session_state["delete_all_step"] = 0
-                    st.rerun()
+                st.success(f"已删除 {count} 个项目！")
+                st.rerun()
+            else:
+                st.error("输入不正确，请输入 'DELETE'")
+        col2.button("取消", key="cancel_3", on_click=_set_state, args=("delete_all_step", 0))
+
 
+@st.fragment
+def _render_board(repo: ProjectRepository, service: ProjectService) -> None:
+    # 调整筛选条件只重跑看板，不重新渲染侧边栏和页面其它部分
     filter_col, search_col = st.columns([1, 2])
     status_filter = filter_col.selectbox("状态筛选", ["全部"] + STATUSES)
-    keyword = search_col.text_input("关键词搜索（项目名/当事人/承办律师）")
+    keyword = search_col.text_input("关键词搜索（项目名/当事人/相对人/承办律师/阶段/备注/附件名）")
 
-    filtered = _filter_projects(projects, status_filter, keyword)
-    if not filtered:
+    visible_statuses = [status for status in STATUSES if status_filter in ("全部", status)]
+    if not keyword.strip() and not any(repo.count(status) for status in visible_statuses):
         st.info("暂无项目，可以点击上方“新建项目”按钮创建。")
         return
 
+    view = st.radio("视图", BOARD_VIEWS, horizontal=True, key="board_view", label_visibility="collapsed")
+    if view == "表格":
+        st.markdown("#### 项目列表")
+        _render_table_view(repo, None if status_filter == "全部" else status_filter, keyword)
+        return
+
     st.markdown("#### 项目卡片")
     selected_fields = st.session_state.get("card_fields", DEFAULT_CARD_FIELDS)
     detail_fields = [label for label in CARD_FIELD_OPTIONS if label in selected_fields]
+    page_size = st.session_state.get("card_page_size", DEFAULT_PAGE_SIZE)
     
     # 三列布局：等待接手 | 正在处理 | 已结案
     col_waiting, col_processing, col_closed = st.columns(3, gap="large")
@@ -267,59 +566,182 @@ def render_dashboard(repo: ProjectRepository, service: ProjectService, projects:
         "已结案": col_closed,
     }
     
-    # 为每列添加标题
-    for status, col in status_columns.items():
-        with col:
-            st.markdown(f"##### {status}")
-    
-    # 按状态分组，在对应列中纵向排列卡片
+    # 按状态分页渲染，每次重跑只生成可见卡片
     for status in STATUSES:
-        group = [p for p in filtered if p.status == status]
         col = status_columns.get(status)
         if not col:
             continue
         with col:
-            for project in group:
-                with st.container(border=True):
-                    st.markdown(f"**{_format_card_value(project, '项目名称')}**")
-                    for label in detail_fields:
-                        st.caption(f"{label}：{_format_card_value(project, label)}")
-                    button_col1, button_col2, button_col3 = st.columns(3, gap="small")
-                    if button_col1.button(
-                        "详情",
-                        key=f"detail_{project.id}",
-                        help="详情",
-                        type="secondary",
-                        use_container_width=True,
-                    ):
-                        render_detail_dialog(project)
-                    if button_col2.button(
-                        "编辑",
-                        key=f"edit_{project.id}",
-                        help="编辑",
-                        type="secondary",
-                        use_container_width=True,
-                    ):
-                        render_edit_dialog(repo, service, project)
-                    if button_col3.button(
-                        "删除",
-                        key=f"delete_{project.id}",
-                        help="删除",
-                        type="secondary",
-                        use_container_width=True,
-                    ):
-                        render_delete_dialog(repo, project)
+            st.markdown(f"##### {status}")
+            if status in visible_statuses:
+                _render_status_column(repo, service, status, keyword, detail_fields, page_size)
+
+
+def _render_table_view(repo: ProjectRepository, status: Optional[str], keyword: str) -> None:
+    frame = get_project_frame()
+    lawyer_options = frame.categories("lawyer")
+    stage_options = frame.categories("stage")
+    _retain_options("table_lawyers", lawyer_options)
+    _retain_options("table_stages", stage_options)
+    lawyer_col, stage_col, order_col = st.columns(3)
+    lawyers = lawyer_col.multiselect("承办律师", lawyer_options, key="table_lawyers")
+    stages = stage_col.multiselect("阶段", stage_options, key="table_stages")
+    order_by = order_col.selectbox(
+        "排序",
+        list(TABLE_ORDER_OPTIONS),
+        format_func=TABLE_ORDER_OPTIONS.get,
+        key="table_order",
+    )
+    needle = keyword.strip()
+    # 关键词仍走全文索引（覆盖备注和附件名），命中的编号再在列式数据上做向量化筛选
+    ids = (
+        _cached_view(repo, ("search_ids", needle), lambda: [project.id for project in repo.query(keyword=needle)])
+        if needle
+        else None
+    )
+    selected = _cached_view(
+        repo,
+        ("table", status, tuple(lawyers), tuple(stages), order_by, needle),
+        lambda: frame.select(status=status, lawyers=lawyers, stages=stages, ids=ids, order_by=order_by),
+    )
+    counts = frame.counts(selected)
+    summary = " · ".join(f"{label} {counts[label]}" for label in STATUSES if counts.get(label))
+    shown = f"，当前显示前 {TABLE_ROW_LIMIT} 个" if len(selected) > TABLE_ROW_LIMIT else ""
+    st.caption(f"共 {len(selected)} 个项目" + (f"（{summary}）" if summary else "") + shown)
+    render_project_table(selected.head(TABLE_ROW_LIMIT))
+
+
+@st.fragment
+def _render_content_search(repo: ProjectRepository) -> None:
+    indexer = get_text_indexer()
+    stats = indexer.stats()
+    with st.expander("附件全文检索"):
+        query = st.text_input("在附件内容中搜索（条款、案号等）", key="content_query")
+        st.caption(f"已索引 {stats['indexed']} / {stats['tracked']} 个附件，待处理 {stats['pending']} 个")
+        if not query.strip():
+            return
+        hits = indexer.search(query)
+        if not hits:
+            st.caption("未找到匹配的附件内容")
+            return
+        for project_id, path, _ in hits:
+            project = repo.get(project_id)
+            if project is None:
+                continue
+            st.markdown(f"**{project.name}** · `{Path(path).name}`")
+            st.caption(indexer.snippet(path, query))
+
+
+@st.fragment
+def _render_status_column(
+    repo: ProjectRepository,
+    service: ProjectService,
+    status: str,
+    keyword: str,
+    detail_fields: List[str],
+    page_size: int,
+) -> None:
+    limit_key = f"card_limit_{status}"
+    expanded_key = f"card_expanded_{status}"
+    collapsed = status in COLLAPSED_STATUSES and not st.session_state.get(expanded_key, False)
+    limit = CLOSED_PREVIEW_COUNT if collapsed else max(st.session_state.get(limit_key, page_size), page_size)
+
+    if keyword.strip():
+        # 全文检索一次得到全部命中，只截取可见部分渲染
+        matched = _cached_view(
+            repo,
+            ("search", status, keyword.strip()),
+            lambda: repo.query(status=status, keyword=keyword, order_by="relevance"),
+        )
+        total = len(matched)
+        group = matched[:limit]
+    else:
+        total = repo.count(status)
+        group = _cached_view(repo, ("page", status, limit), lambda: repo.query(status=status, limit=limit))
+
+    st.caption(f"共 {total} 个项目" + (f"，当前显示 {len(group)} 个" if len(group) < total else ""))
+    for project in group:
+        _render_project_card(repo, service, project, detail_fields)
+
+    if status in COLLAPSED_STATUSES and not collapsed:
+        st.button(
+            "收起",
+            key=f"collapse_{status}",
+            use_container_width=True,
+            on_click=_set_state,
+            args=(expanded_key, False),
+        )
+    if len(group) >= total:
+        return
+    if collapsed:
+        st.button(
+            "展开全部",
+            key=f"expand_{status}",
+            use_container_width=True,
+            on_click=_set_state,
+            args=(expanded_key, True),
+        )
+    else:
+        st.button(
+            f"加载更多（剩余 {total - len(group)} 个）",
+            key=f"more_{status}",
+            use_container_width=True,
+            on_click=_set_state,
+            args=(limit_key, limit + page_size),
+        )
+
+
+def _render_project_card(
+    repo: ProjectRepository,
+    service: ProjectService,
+    project: Project,
+    detail_fields: List[str],
+) -> None:
+    with st.container(border=True):
+        st.markdown(f"**{_format_card_value(project, '项目名称')}**")
+        for label in detail_fields:
+            st.caption(f"{label}：{_format_card_value(project, label)}")
+        broken = get_link_watcher().broken_paths(project.id)
+        if broken:
+            st.caption(f"⚠️ {len(broken)} 个附件路径失效")
+        button_col1, button_col2, button_col3 = st.columns(3, gap="small")
+        if button_col1.button(
+            "详情",
+            key=f"detail_{project.id}",
+            help="详情",
+            type="secondary",
+            use_container_width=True,
+        ):
+            render_detail_dialog(project)
+        if button_col2.button(
+            "编辑",
+            key=f"edit_{project.id}",
+            help="编辑",
+            type="secondary",
+            use_container_width=True,
+        ):
+            render_edit_dialog(repo, service, project)
+        if button_col3.button(
+            "删除",
+            key=f"delete_{project.id}",
+            help="删除",
+            type="secondary",
+            use_container_width=True,
+        ):
+            render_delete_dialog(repo, project)
 
 
 @st.dialog("初始化新项目")
 def render_create_dialog(repo: ProjectRepository, service: ProjectService) -> None:
+    st.session_state[DIALOG_OPEN_KEY] = True
     st.caption("初始化仅需填写关键信息，文件路径等可在编辑中补充。")
 
-    with st.form("create_project_form", clear_on_submit=True):
+    with st.form("create_project_form", clear_on_submit=False):
         client = st.text_input("当事人")
         opponent = st.text_input("相对人")
         lawyer = st.text_input("承办律师")
         notes = st.text_area("备注（可选）")
+        acknowledged = st.checkbox("已审查利益冲突，仍然创建")
         submitted = st.form_submit_button("创建项目")
 
     if not submitted:
@@ -335,6 +757,16 @@ def render_create_dialog(repo: ProjectRepository, service: ProjectService) -> No
         st.error("请填写承办律师。")
         return
 
+    hits = service.check_conflicts(repo, client.strip(), opponent.strip())
+    conflicts = [hit for hit in hits if hit.conflict]
+    if conflicts and not acknowledged:
+        st.error(f"利益冲突检索发现 {len(conflicts)} 处冲突，请审查后勾选确认再创建：")
+        for hit in conflicts:
+            st.caption(f"「{hit.party}」在项目「{hit.project.name}」中为{ROLE_LABELS[hit.role]}（{hit.project.status}）")
+        return
+    if hits and not conflicts:
+        st.toast(f"当事人/相对人在 {len(hits)} 个既有项目中以相同身份出现过。")
+
     name = _build_project_name(client.strip(), opponent.strip())
     project = service.build_project(
         name=name,
@@ -352,9 +784,40 @@ def render_create_dialog(repo: ProjectRepository, service: ProjectService) -> No
     st.rerun()
 
 
+@st.fragment(run_every=CHANGE_CHECK_SECONDS)
+def _watch_changes() -> None:
+    """其它会话或进程保存数据后整页重跑，没有变化时只比较内存中的计数器"""
+    version = get_change_notifier().version
+    seen = st.session_state.setdefault("seen_change_version", version)
+    if version == seen or st.session_state.get(DIALOG_OPEN_KEY):
+        return
+    st.session_state["seen_change_version"] = version
+    st.rerun()
+
+
+def _render_load_errors(repo: ProjectRepository) -> None:
+    errors = repo.load_errors()
+    if not errors:
+        return
+    st.warning(f"数据文件中有 {len(errors)} 处内容无法读取，已跳过；下次保存前会自动备份原文件。")
+    with st.expander("查看损坏位置"):
+        for error in errors[:50]:
+            st.caption(str(error))
+        st.caption("可运行 python -m core.migrate data/projects.json 修复并转换为当前格式。")
+
+
 def render_app() -> None:
-    repo = ProjectRepository(DATA_FILE)
+    repo = get_repository()
     service = ProjectService()
+    # 整页重跑时对话框都已关闭；打开的对话框会在本次运行中重新设置该标记
+    st.session_state[DIALOG_OPEN_KEY] = False
+    # 整页重跑读取的已是最新数据，之前的通知都不再需要触发刷新
+    st.session_state["seen_change_version"] = get_change_notifier().version
+    # 启动（或复用）进程内的后台服务
+    get_link_watcher()
+    get_folder_indexer()
+    get_text_indexer()
+    get_content_hasher()
 
     st.title("律师案件管理")
     st.caption("本地文件链接 + 项目状态管理的初版看板")
@@ -433,8 +896,10 @@ button[title="删除"]:hover, button[aria-label="删除"]:hover {
         unsafe_allow_html=True,
     )
 
+    _render_load_errors(repo)
+    _watch_changes()
+
     if st.button("新建项目", type="primary"):
         render_create_dialog(repo, service)
 
-    projects_for_dashboard = repo.list()
-    render_dashboard(repo, service, projects_for_dashboard)
+    render_dashboard(repo, service)